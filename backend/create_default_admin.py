@@ -10,7 +10,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # Load environment variables
 load_dotenv()
 
-from db.database import engine, create_db_and_tables
+from db.database import engine
+from db.bootstrap import check_schema_version
 from db.models import User
 from utils.security import get_password_hash
 
@@ -27,10 +28,8 @@ def create_default_admin():
     print(f"Password length: {len(admin_password)} chars")
     
     try:
-        # Ensure database tables exist
-        print("Creating database tables...")
-        create_db_and_tables()
-        print("Tables created successfully")
+        # The entrypoint bootstraps the database before this script runs
+        check_schema_version()
         
         with Session(engine) as session:
             # Check if admin user already exists
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+One-time database bootstrap: migrations, table types and the default room.
+
+Run once per deployment before starting the API workers:
+
+    python -m db.bootstrap
+
+Concurrent runs are serialized with a PostgreSQL advisory lock, so several
+containers starting at once do not race each other. The API workers
+themselves only check the schema version at startup.
+"""
+
+import logging
+import os
+import sys
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+from db.database import engine
+from db.migrate import upgrade, current_version, LATEST_VERSION
+from db.init_table_types import init_table_types
+from db.create_default_room import create_default_room
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key of the bootstrap advisory lock
+BOOTSTRAP_LOCK_ID = 7_204_001
+
+
+def bootstrap():
+    """Bring the database up to date; safe to run from several processes at once"""
+    with engine.connect() as lock_connection:
+        logger.info("Waiting for the bootstrap lock...")
+        lock_connection.execute(text("SELECT pg_advisory_lock(:lock_id)"), {"lock_id": BOOTSTRAP_LOCK_ID})
+        try:
+            version = upgrade()
+            logger.info(f"Schema is at version {version}")
+            init_table_types()
+            create_default_room()
+        finally:
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": BOOTSTRAP_LOCK_ID})
+
+
+def check_schema_version():
+    """
+    Fast startup check for API workers: fail instead of migrating when the
+    database has not been bootstrapped for this version of the code
+    """
+    version = current_version()
+    if version < LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version}, this code needs {LATEST_VERSION}. "
+            "Run `python -m db.bootstrap` first."
+        )
+    if version > LATEST_VERSION:
+        logger.warning(f"Database schema version {version} is newer than this code ({LATEST_VERSION})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    bootstrap()
@@ -16,18 +16,29 @@ load_dotenv()
 
 from db.database import engine
 from db.models import Room
+from db.invalidation import publish
 
 def create_default_room():
-    """Create a default room if no rooms exist in the database"""
+    """Create a default room if no rooms exist, and make sure one room is the default"""
     print("=== Checking for default room ===")
     
     try:
         with Session(engine) as session:
+            default_room = session.exec(select(Room).where(Room.is_default == True)).first()
+            if default_room:
+                print(f"Default room: {default_room.name} (ID: {default_room.id})")
+                return default_room
+            
             # Check if any rooms exist
-            existing_room = session.exec(select(Room)).first()
+            existing_room = session.exec(select(Room).order_by(Room.created_at)).first()
             
             if existing_room:
-                print(f"Room already exists: {existing_room.name} (ID: {existing_room.id})")
+                print(f"Making the oldest room the default one: {existing_room.name} (ID: {existing_room.id})")
+                existing_room.is_default = True
+                session.add(existing_room)
+                publish(session, "rooms")
+                session.commit()
+                session.refresh(existing_room)
                 return existing_room
             
             print("No existing rooms found. Creating default room...")
@@ -35,7 +46,8 @@ def create_default_room():
             # Create default room
             default_room = Room(
                 name="Основной зал",
-                description="Основной зал ресторана"
+                description="Основной зал ресторана",
+                is_default=True
             )
             
             session.add(default_room)
@@ -1,5 +1,5 @@
 import os
-from sqlmodel import create_engine, Session, SQLModel
+from sqlmodel import create_engine, Session
 
 # Get the DATABASE_URL from environment variable with a fallback
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/restaurant")
@@ -11,7 +11,3 @@ engine = create_engine(DATABASE_URL)
 def get_session():
     with Session(engine) as session:
         yield session
-
-# Create all tables
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine) 
\ No newline at end of file
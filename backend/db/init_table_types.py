@@ -6,8 +6,9 @@ including the banquet hall type that's currently missing.
 """
 
 from sqlmodel import Session, select
-from db.database import get_session, engine
+from db.database import engine
 from db.models import TableType
+from layout.versions import bump_table_type_layout_versions
 
 # Predefined table types with IDs
 TABLE_TYPES = [
@@ -59,38 +60,33 @@ TABLE_TYPES = [
 ]
 
 def init_table_types():
-    """Initialize table types in the database."""
+    """Initialize table types in the database, writing only rows that differ."""
     print("Initializing table types...")
+    changed = 0
     with Session(engine) as session:
-        # Get existing types
-        existing_types = session.exec(select(TableType)).all()
-        existing_ids = {t.id for t in existing_types}
+        existing_types = {t.id: t for t in session.exec(select(TableType)).all()}
         
-        # Check and add missing types
         for type_data in TABLE_TYPES:
-            if type_data["id"] not in existing_ids:
+            existing_type = existing_types.get(type_data["id"])
+            if existing_type is None:
                 # Create type if it doesn't exist
-                new_type = TableType(**type_data)
-                session.add(new_type)
+                session.add(TableType(**type_data))
                 print(f"Created table type: {type_data['name']} (ID: {type_data['id']})")
-            else:
-                # Update existing type
-                existing_type = session.get(TableType, type_data["id"])
+                changed += 1
+            elif any(getattr(existing_type, key) != value for key, value in type_data.items()):
+                # Update existing type only if it drifted from the definition
                 for key, value in type_data.items():
                     setattr(existing_type, key, value)
+                session.add(existing_type)
+                # The type is rendered with every layout that uses it
+                bump_table_type_layout_versions(session, existing_type.id)
                 print(f"Updated table type: {type_data['name']} (ID: {type_data['id']})")
+                changed += 1
         
-        # Commit changes
-        session.commit()
+        if changed:
+            session.commit()
     
-    # Verify all types are present
-    with Session(engine) as session:
-        all_types = session.exec(select(TableType)).all()
-        print("\nCurrent table types in database:")
-        for table_type in all_types:
-            print(f"ID: {table_type.id}, Name: {table_type.name}, Display: {table_type.display_name}")
-    
-    print("\nTable types initialization completed.")
+    print(f"Table types initialization completed ({changed} changed).")
 
 if __name__ == "__main__":
-    init_table_types() 
\ No newline at end of file
+    init_table_types()
@@ -0,0 +1,153 @@
+"""
+Cross-worker cache invalidation bus.
+
+Writers call publish() inside their transaction. The event is sent with
+PostgreSQL NOTIFY, so it is delivered to other workers only if the
+transaction commits, and it is applied to this worker's caches right after
+the commit. Every worker runs a background listener that evicts its local
+caches when another worker publishes.
+"""
+
+import json
+import logging
+import os
+import select
+import socket
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+import psycopg2
+import psycopg2.extensions
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from db.database import DATABASE_URL, engine
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+
+# Identifies this worker so that it can skip its own notifications
+ORIGIN = f"{socket.gethostname()}:{os.getpid()}"
+
+_PENDING_KEY = "pending_invalidations"
+
+# topic -> handlers called with a list of keys, or None for "everything"
+_handlers: Dict[str, List[Callable[[Optional[List[str]]], None]]] = {}
+
+_listener_thread: Optional[threading.Thread] = None
+_stop_event = threading.Event()
+
+
+def subscribe(topic: str, handler: Callable[[Optional[List[str]]], None]):
+    """Register a local cache eviction handler for a topic"""
+    _handlers.setdefault(topic, []).append(handler)
+
+
+def publish(session: Session, topic: str, keys: Optional[Iterable] = None):
+    """
+    Announce that cached data for `keys` under `topic` changes with the
+    current transaction. Passing no keys invalidates the whole topic.
+    """
+    if keys is not None:
+        keys = sorted({str(key) for key in keys})
+
+    session.info.setdefault(_PENDING_KEY, []).append((topic, keys))
+
+    if session.get_bind().dialect.name == "postgresql":
+        payload = json.dumps({"origin": ORIGIN, "topic": topic, "keys": keys})
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": CHANNEL, "payload": payload}
+        )
+
+
+def _dispatch(topic: str, keys: Optional[List[str]]):
+    for handler in _handlers.get(topic, []):
+        try:
+            handler(keys)
+        except Exception as e:
+            logger.error(f"Error invalidating '{topic}' cache: {str(e)}")
+
+
+def _dispatch_all():
+    for topic in list(_handlers):
+        _dispatch(topic, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    for topic, keys in session.info.pop(_PENDING_KEY, []):
+        _dispatch(topic, keys)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _handle_notification(payload: str):
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        logger.warning(f"Ignoring malformed invalidation message: {payload}")
+        return
+
+    if message.get("origin") == ORIGIN:
+        # Already applied locally after commit
+        return
+
+    _dispatch(message.get("topic"), message.get("keys"))
+
+
+def _listen():
+    backoff = 1
+    while not _stop_event.is_set():
+        connection = None
+        try:
+            connection = psycopg2.connect(DATABASE_URL)
+            connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            logger.info(f"Listening for cache invalidations on '{CHANNEL}'")
+
+            # Anything published while we were not listening is lost
+            _dispatch_all()
+            backoff = 1
+
+            while not _stop_event.is_set():
+                if select.select([connection], [], [], 5) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    _handle_notification(connection.notifies.pop(0).payload)
+        except Exception as e:
+            logger.error(f"Cache invalidation listener error: {str(e)}")
+            _stop_event.wait(backoff)
+            backoff = min(backoff * 2, 30)
+        finally:
+            if connection is not None:
+                connection.close()
+
+
+def start_listener():
+    """Start the background invalidation listener for this worker"""
+    global _listener_thread
+
+    if engine.dialect.name != "postgresql":
+        logger.info("Cache invalidation listener disabled (not a PostgreSQL database)")
+        return
+
+    if _listener_thread is not None and _listener_thread.is_alive():
+        return
+
+    _stop_event.clear()
+    _listener_thread = threading.Thread(target=_listen, name="cache-invalidation", daemon=True)
+    _listener_thread.start()
+
+
+def stop_listener():
+    """Stop the background invalidation listener"""
+    _stop_event.set()
+    if _listener_thread is not None:
+        _listener_thread.join(timeout=10)
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations.
+
+Every schema change is a numbered migration here, written out in SQL rather
+than derived from the current models, so that a migration creates the same
+schema whenever it runs. The applied version is stored in the
+schema_migrations table.
+
+Usage:
+    python -m db.migrate upgrade [version]    # default: latest version
+    python -m db.migrate downgrade <version>
+    python -m db.migrate current
+    python -m db.migrate check-plans          # fail if a hot query plan uses a sequential scan
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from dotenv import load_dotenv
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+from db.database import engine
+from db.models import RESERVATION_TIME_SPAN_SQL
+
+logger = logging.getLogger(__name__)
+
+
+# Schema of the models before the first migration, as create_all made it.
+# Later columns and tables belong to their own migrations, not here.
+BASELINE_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS categories ("
+    "id UUID NOT NULL, "
+    "name VARCHAR NOT NULL, "
+    "PRIMARY KEY (id))",
+    "CREATE TABLE IF NOT EXISTS rooms ("
+    "id UUID NOT NULL, "
+    "name VARCHAR NOT NULL, "
+    "description VARCHAR, "
+    "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+    "updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+    "PRIMARY KEY (id))",
+    "CREATE INDEX IF NOT EXISTS ix_rooms_name ON rooms (name)",
+    "CREATE TABLE IF NOT EXISTS table_types ("
+    "id SERIAL NOT NULL, "
+    "name VARCHAR NOT NULL, "
+    "display_name VARCHAR NOT NULL, "
+    "default_width INTEGER NOT NULL, "
+    "default_height INTEGER NOT NULL, "
+    "default_max_guests INTEGER NOT NULL, "
+    "color_code VARCHAR, "
+    "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+    "updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+    "PRIMARY KEY (id))",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_table_types_name ON table_types (name)",
+    "CREATE TABLE IF NOT EXISTS users ("
+    "id UUID NOT NULL, "
+    "email VARCHAR NOT NULL, "
+    "password_hash VARCHAR NOT NULL, "
+    "first_name VARCHAR, "
+    "last_name VARCHAR, "
+    "phone VARCHAR, "
+    "role VARCHAR NOT NULL, "
+    "PRIMARY KEY (id))",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)",
+    "CREATE TABLE IF NOT EXISTS menu_items ("
+    "id UUID NOT NULL, "
+    "name VARCHAR NOT NULL, "
+    "description VARCHAR NOT NULL, "
+    "price FLOAT NOT NULL, "
+    "image_url VARCHAR, "
+    "category_id UUID NOT NULL, "
+    "PRIMARY KEY (id), "
+    "FOREIGN KEY (category_id) REFERENCES categories (id))",
+    "CREATE TABLE IF NOT EXISTS static_items ("
+    "id UUID NOT NULL, "
+    "type VARCHAR NOT NULL, "
+    "x INTEGER NOT NULL, "
+    "y INTEGER NOT NULL, "
+    "rotation INTEGER NOT NULL, "
+    "room_id UUID NOT NULL, "
+    "PRIMARY KEY (id), "
+    "FOREIGN KEY (room_id) REFERENCES rooms (id))",
+    "CREATE TABLE IF NOT EXISTS tables ("
+    "id UUID NOT NULL, "
+    "type_id INTEGER NOT NULL, "
+    "table_number INTEGER NOT NULL, "
+    "max_guests INTEGER NOT NULL, "
+    "x INTEGER NOT NULL, "
+    "y INTEGER NOT NULL, "
+    "rotation INTEGER NOT NULL, "
+    "width INTEGER, "
+    "height INTEGER, "
+    "room_id UUID NOT NULL, "
+    "is_active BOOLEAN NOT NULL, "
+    "PRIMARY KEY (id), "
+    "FOREIGN KEY (type_id) REFERENCES table_types (id), "
+    "FOREIGN KEY (room_id) REFERENCES rooms (id))",
+    "CREATE TABLE IF NOT EXISTS walls ("
+    "id UUID NOT NULL, "
+    "x INTEGER NOT NULL, "
+    "y INTEGER NOT NULL, "
+    "rotation INTEGER NOT NULL, "
+    "length INTEGER NOT NULL, "
+    "room_id UUID NOT NULL, "
+    "PRIMARY KEY (id), "
+    "FOREIGN KEY (room_id) REFERENCES rooms (id))",
+    "CREATE TABLE IF NOT EXISTS reservations ("
+    "id UUID NOT NULL, "
+    "user_id UUID NOT NULL, "
+    "table_id UUID NOT NULL, "
+    "reservation_date DATE NOT NULL, "
+    "reservation_time TIME WITHOUT TIME ZONE NOT NULL, "
+    "duration INTEGER NOT NULL, "
+    "guests_count INTEGER NOT NULL, "
+    "first_name VARCHAR NOT NULL, "
+    "last_name VARCHAR NOT NULL, "
+    "phone VARCHAR NOT NULL, "
+    "status VARCHAR NOT NULL, "
+    "PRIMARY KEY (id), "
+    "FOREIGN KEY (user_id) REFERENCES users (id), "
+    "FOREIGN KEY (table_id) REFERENCES tables (id))",
+    "CREATE TABLE IF NOT EXISTS order_items ("
+    "id UUID NOT NULL, "
+    "reservation_id UUID NOT NULL, "
+    "menu_item_id UUID NOT NULL, "
+    "quantity INTEGER NOT NULL, "
+    "PRIMARY KEY (id), "
+    "FOREIGN KEY (reservation_id) REFERENCES reservations (id), "
+    "FOREIGN KEY (menu_item_id) REFERENCES menu_items (id))",
+]
+
+
+def _add_reservation_time_span(connection):
+    connection.execute(text(
+        "ALTER TABLE reservations ADD COLUMN IF NOT EXISTS time_span tsrange "
+        f"GENERATED ALWAYS AS ({RESERVATION_TIME_SPAN_SQL}) STORED"
+    ))
+
+    # The exclusion constraint needs btree_gist and data without overlaps;
+    # fall back to a plain GiST index if either is missing
+    savepoint = connection.begin_nested()
+    try:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+        connection.execute(text(
+            "ALTER TABLE reservations ADD CONSTRAINT reservations_no_overlap "
+            "EXCLUDE USING gist (table_id WITH =, time_span WITH &&)"
+        ))
+        savepoint.commit()
+    except DBAPIError as e:
+        savepoint.rollback()
+        logger.warning(f"Could not add reservations_no_overlap constraint, using a plain GiST index: {e.orig}")
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_reservations_time_span ON reservations USING gist (time_span)"
+        ))
+
+
+# Each migration runs in its own transaction. Steps are SQL strings or
+# callables taking the connection.
+MIGRATIONS = [
+    {
+        "version": 1,
+        "name": "baseline schema",
+        "upgrade": BASELINE_SCHEMA,
+        "downgrade": None,  # Irreversible
+    },
+    {
+        "version": 2,
+        "name": "reservation time ranges",
+        "upgrade": [_add_reservation_time_span],
+        "downgrade": [
+            "ALTER TABLE reservations DROP CONSTRAINT IF EXISTS reservations_no_overlap",
+            "DROP INDEX IF EXISTS ix_reservations_time_span",
+            "ALTER TABLE reservations DROP COLUMN IF EXISTS time_span",
+        ],
+    },
+    {
+        "version": 3,
+        "name": "hot query indexes",
+        "upgrade": [
+            "CREATE INDEX IF NOT EXISTS ix_reservations_table_id_reservation_date ON reservations (table_id, reservation_date)",
+            "CREATE INDEX IF NOT EXISTS ix_reservations_reservation_date ON reservations (reservation_date)",
+            "CREATE INDEX IF NOT EXISTS ix_reservations_user_id ON reservations (user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_order_items_reservation_id ON order_items (reservation_id)",
+            "CREATE INDEX IF NOT EXISTS ix_order_items_menu_item_id ON order_items (menu_item_id)",
+            "CREATE INDEX IF NOT EXISTS ix_menu_items_category_id ON menu_items (category_id)",
+            "CREATE INDEX IF NOT EXISTS ix_tables_room_id_active ON tables (room_id) WHERE is_active",
+            "CREATE INDEX IF NOT EXISTS ix_static_items_room_id ON static_items (room_id)",
+            "CREATE INDEX IF NOT EXISTS ix_walls_room_id ON walls (room_id)",
+        ],
+        "downgrade": [
+            "DROP INDEX IF EXISTS ix_reservations_table_id_reservation_date",
+            "DROP INDEX IF EXISTS ix_reservations_reservation_date",
+            "DROP INDEX IF EXISTS ix_reservations_user_id",
+            "DROP INDEX IF EXISTS ix_order_items_reservation_id",
+            "DROP INDEX IF EXISTS ix_order_items_menu_item_id",
+            "DROP INDEX IF EXISTS ix_menu_items_category_id",
+            "DROP INDEX IF EXISTS ix_tables_room_id_active",
+            "DROP INDEX IF EXISTS ix_static_items_room_id",
+            "DROP INDEX IF EXISTS ix_walls_room_id",
+        ],
+    },
+    {
+        "version": 4,
+        "name": "reservation daily stats rollup",
+        "upgrade": [
+            "CREATE TABLE IF NOT EXISTS reservation_daily_stats ("
+            "stat_date DATE NOT NULL, "
+            "table_id UUID NOT NULL REFERENCES tables (id), "
+            "reservation_count INTEGER NOT NULL DEFAULT 0, "
+            "cancelled_count INTEGER NOT NULL DEFAULT 0, "
+            "guests_sum INTEGER NOT NULL DEFAULT 0, "
+            "duration_sum INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (stat_date, table_id))",
+            "DELETE FROM reservation_daily_stats",
+            "INSERT INTO reservation_daily_stats "
+            "(stat_date, table_id, reservation_count, cancelled_count, guests_sum, duration_sum) "
+            "SELECT reservation_date, table_id, COUNT(*), COUNT(*) FILTER (WHERE status = 'cancelled'), "
+            "SUM(guests_count), SUM(duration) "
+            "FROM reservations GROUP BY reservation_date, table_id",
+        ],
+        "downgrade": [
+            "DROP TABLE IF EXISTS reservation_daily_stats",
+        ],
+    },
+    {
+        "version": 5,
+        "name": "menu item sales counters",
+        "upgrade": [
+            "CREATE TABLE IF NOT EXISTS menu_item_sales ("
+            "menu_item_id UUID PRIMARY KEY REFERENCES menu_items (id), "
+            "quantity_sold INTEGER NOT NULL DEFAULT 0)",
+            "DELETE FROM menu_item_sales",
+            "INSERT INTO menu_item_sales (menu_item_id, quantity_sold) "
+            "SELECT menu_item_id, SUM(quantity) FROM order_items GROUP BY menu_item_id",
+        ],
+        "downgrade": [
+            "DROP TABLE IF EXISTS menu_item_sales",
+        ],
+    },
+    {
+        "version": 6,
+        "name": "layout versions and snapshots",
+        "upgrade": [
+            "ALTER TABLE rooms ADD COLUMN IF NOT EXISTS layout_version INTEGER NOT NULL DEFAULT 0",
+            "CREATE TABLE IF NOT EXISTS layout_snapshots ("
+            "room_id UUID NOT NULL REFERENCES rooms (id), "
+            "version INTEGER NOT NULL, "
+            "layout JSON NOT NULL, "
+            "created_at TIMESTAMP NOT NULL, "
+            "PRIMARY KEY (room_id, version))",
+        ],
+        "downgrade": [
+            "DROP TABLE IF EXISTS layout_snapshots",
+            "ALTER TABLE rooms DROP COLUMN IF EXISTS layout_version",
+        ],
+    },
+    {
+        "version": 7,
+        "name": "default room flag",
+        "upgrade": [
+            "ALTER TABLE rooms ADD COLUMN IF NOT EXISTS is_default BOOLEAN NOT NULL DEFAULT false",
+            # At most one room can be the default one
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_rooms_single_default ON rooms (is_default) WHERE is_default",
+            # The room that requests without a room_id used to get: the one of
+            # the first active table, otherwise the oldest room
+            "UPDATE rooms SET is_default = true WHERE id = COALESCE("
+            "(SELECT room_id FROM tables WHERE is_active LIMIT 1), "
+            "(SELECT id FROM rooms ORDER BY created_at LIMIT 1)) "
+            "AND NOT EXISTS (SELECT 1 FROM rooms WHERE is_default)",
+        ],
+        "downgrade": [
+            "DROP INDEX IF EXISTS ix_rooms_single_default",
+            "ALTER TABLE rooms DROP COLUMN IF EXISTS is_default",
+        ],
+    },
+]
+
+LATEST_VERSION = MIGRATIONS[-1]["version"]
+
+
+def _ensure_version_table(connection):
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "name VARCHAR NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL DEFAULT now())"
+    ))
+
+
+def _run_steps(connection, steps):
+    for step in steps:
+        if callable(step):
+            step(connection)
+        else:
+            connection.execute(text(step))
+
+
+def current_version(connection=None) -> int:
+    """Get the latest applied migration version (0 for an empty database)"""
+    if connection is None:
+        with engine.connect() as connection:
+            return current_version(connection)
+
+    exists = connection.execute(text("SELECT to_regclass('schema_migrations')")).scalar()
+    if not exists:
+        return 0
+    return connection.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+
+def upgrade(target: int = None):
+    """Apply all migrations up to `target` (default: the latest one)"""
+    target = LATEST_VERSION if target is None else target
+
+    with engine.begin() as connection:
+        _ensure_version_table(connection)
+        version = current_version(connection)
+
+    for migration in MIGRATIONS:
+        if version < migration["version"] <= target:
+            logger.info(f"Applying migration {migration['version']}: {migration['name']}")
+            with engine.begin() as connection:
+                _run_steps(connection, migration["upgrade"])
+                connection.execute(
+                    text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                    {"version": migration["version"], "name": migration["name"]}
+                )
+
+    return max(version, min(target, LATEST_VERSION))
+
+
+def downgrade(target: int):
+    """Revert applied migrations down to `target`"""
+    version = current_version()
+
+    for migration in reversed(MIGRATIONS):
+        if target < migration["version"] <= version:
+            if migration["downgrade"] is None:
+                raise RuntimeError(f"Migration {migration['version']} ({migration['name']}) cannot be reverted")
+            logger.info(f"Reverting migration {migration['version']}: {migration['name']}")
+            with engine.begin() as connection:
+                _run_steps(connection, migration["downgrade"])
+                connection.execute(
+                    text("DELETE FROM schema_migrations WHERE version = :version"),
+                    {"version": migration["version"]}
+                )
+
+    return min(version, target)
+
+
+# Hot query paths of the services; each must be answerable from an index
+HOT_QUERIES = [
+    (
+        "reservations of a table on a date",
+        "SELECT * FROM reservations WHERE table_id = :table_id AND reservation_date = :day",
+    ),
+    (
+        "overlapping reservation of a table",
+        "SELECT id FROM reservations WHERE table_id = :table_id AND time_span && tsrange(:start, :end) LIMIT 1",
+    ),
+    (
+        "reservations on a date",
+        "SELECT * FROM reservations WHERE reservation_date = :day",
+    ),
+    (
+        "reservations in a date range",
+        "SELECT * FROM reservations WHERE reservation_date BETWEEN :day AND :last_day",
+    ),
+    (
+        "reservations of a user",
+        "SELECT * FROM reservations WHERE user_id = :user_id",
+    ),
+    (
+        "active tables of a room",
+        "SELECT * FROM tables WHERE room_id = :room_id AND is_active",
+    ),
+    (
+        "static items of a room",
+        "SELECT * FROM static_items WHERE room_id = :room_id",
+    ),
+    (
+        "walls of a room",
+        "SELECT * FROM walls WHERE room_id = :room_id",
+    ),
+    (
+        "order items of a reservation",
+        "SELECT * FROM order_items WHERE reservation_id = :reservation_id",
+    ),
+    (
+        "order items of a menu item",
+        "SELECT id FROM order_items WHERE menu_item_id = :menu_item_id LIMIT 1",
+    ),
+    (
+        "menu items of a category",
+        "SELECT * FROM menu_items WHERE category_id = :category_id",
+    ),
+]
+
+
+def _plan_node_types(plan):
+    yield plan["Node Type"]
+    for child in plan.get("Plans", []):
+        yield from _plan_node_types(child)
+
+
+def check_query_plans() -> list:
+    """
+    EXPLAIN every hot query with sequential scans discouraged and return the
+    names of the queries that still need one (i.e. have no usable index)
+    """
+    start = datetime.combine(date.today(), time(hour=18))
+    params = {
+        "table_id": uuid4(),
+        "user_id": uuid4(),
+        "room_id": uuid4(),
+        "reservation_id": uuid4(),
+        "menu_item_id": uuid4(),
+        "category_id": uuid4(),
+        "day": date.today(),
+        "last_day": date.today() + timedelta(days=14),
+        "start": start,
+        "end": start + timedelta(hours=2),
+    }
+
+    failures = []
+    with engine.connect() as connection:
+        with connection.begin():
+            # Tiny tables are cheapest to scan, so make the planner prefer any index
+            connection.execute(text("SET LOCAL enable_seqscan = off"))
+            for name, sql in HOT_QUERIES:
+                plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                if "Seq Scan" in _plan_node_types(plan[0]["Plan"]):
+                    failures.append(name)
+    return failures
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Manage the database schema version")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = subparsers.add_parser("upgrade", help="Apply migrations")
+    upgrade_parser.add_argument("version", type=int, nargs="?", help="Target version (default: latest)")
+    downgrade_parser = subparsers.add_parser("downgrade", help="Revert migrations")
+    downgrade_parser.add_argument("version", type=int, help="Target version")
+    subparsers.add_parser("current", help="Show the applied version")
+    subparsers.add_parser("check-plans", help="Fail if a hot query falls back to a sequential scan")
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        print(f"Schema is at version {upgrade(args.version)}")
+    elif args.command == "downgrade":
+        print(f"Schema is at version {downgrade(args.version)}")
+    elif args.command == "current":
+        print(f"Schema version: {current_version()} (latest: {LATEST_VERSION})")
+    elif args.command == "check-plans":
+        failures = check_query_plans()
+        for name in failures:
+            print(f"Sequential scan: {name}")
+        if failures:
+            sys.exit(1)
+        print(f"All {len(HOT_QUERIES)} hot queries use indexes")
@@ -1,6 +1,8 @@
 from datetime import date, time, datetime
 from typing import List, Optional
 from uuid import UUID, uuid4
+from sqlalchemy import JSON, Column, Computed
+from sqlalchemy.dialects.postgresql import TSRANGE
 from sqlmodel import Field, SQLModel, Relationship
 
 
@@ -10,6 +12,8 @@ class Room(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     name: str = Field(index=True)
     description: Optional[str] = None
+    layout_version: int = Field(default=0)  # Bumped by every layout change
+    is_default: bool = Field(default=False)  # Room of requests without a room_id, at most one
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     
@@ -18,6 +22,16 @@ class Room(SQLModel, table=True):
     walls: List["Wall"] = Relationship(back_populates="room")
 
 
+# Layout of a room as saved at one layout_version, kept for rollbacks
+class LayoutSnapshot(SQLModel, table=True):
+    __tablename__ = "layout_snapshots"
+    
+    room_id: UUID = Field(foreign_key="rooms.id", primary_key=True)
+    version: int = Field(primary_key=True)
+    layout: dict = Field(sa_column=Column(JSON, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.now)
+
+
 class TableType(SQLModel, table=True):
     __tablename__ = "table_types"
     
@@ -114,6 +128,32 @@ class Reservation(SQLModel, table=True):
     ordered_items: List["OrderItem"] = Relationship(back_populates="reservation")
 
 
+
+# Per (date, table) rollup of reservations, kept in sync by reservations.rollup
+class ReservationDailyStats(SQLModel, table=True):
+    __tablename__ = "reservation_daily_stats"
+    
+    stat_date: date = Field(primary_key=True)
+    table_id: UUID = Field(foreign_key="tables.id", primary_key=True)
+    reservation_count: int = Field(default=0)
+    cancelled_count: int = Field(default=0)
+    guests_sum: int = Field(default=0)
+    duration_sum: int = Field(default=0)
+
+
+# Booked time range [start, start + duration hours), computed by PostgreSQL.
+# It is not mapped on the model: nothing writes it, and overlap queries
+# use reservation_time_span directly.
+RESERVATION_TIME_SPAN_SQL = (
+    "tsrange(reservation_date + reservation_time, "
+    "reservation_date + reservation_time + duration * interval '1 hour')"
+)
+Reservation.__table__.append_column(
+    Column("time_span", TSRANGE, Computed(RESERVATION_TIME_SPAN_SQL, persisted=True))
+)
+reservation_time_span = Reservation.__table__.c.time_span
+
+
 class Category(SQLModel, table=True):
     __tablename__ = "categories"
     
@@ -146,4 +186,12 @@ class OrderItem(SQLModel, table=True):
     quantity: int
     
     reservation: Reservation = Relationship(back_populates="ordered_items")
-    menu_item: MenuItem = Relationship(back_populates="order_items") 
\ No newline at end of file
+    menu_item: MenuItem = Relationship(back_populates="order_items")
+
+
+# Running sales counters per menu item, kept in sync by menu.sales
+class MenuItemSales(SQLModel, table=True):
+    __tablename__ = "menu_item_sales"
+    
+    menu_item_id: UUID = Field(foreign_key="menu_items.id", primary_key=True)
+    quantity_sold: int = Field(default=0) 
\ No newline at end of file
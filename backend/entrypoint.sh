@@ -1,10 +1,10 @@
 #!/bin/bash
 
+# Apply migrations and seed table types and the default room (runs once, under a lock)
+python -m db.bootstrap
+
 # Create default admin user
 python create_default_admin.py
 
-# Create default room if needed
-python -m db.create_default_room
-
 # Start the API server with hot reload
-exec uvicorn main:app --host 0.0.0.0 --port 8000 --reload
\ No newline at end of file
+exec uvicorn main:app --host 0.0.0.0 --port 8000 --reload
@@ -0,0 +1,123 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from uuid import UUID
+from sqlmodel import Session
+from db.invalidation import subscribe
+from schemas.layout import Layout, EnhancedLayout
+from .services import get_layout, resolve_room_id
+from .versions import get_layout_version, layout_etag
+from .compact import compact_layout
+
+# Maximum number of cached layout representations per worker
+LAYOUT_CACHE_SIZE = int(os.getenv("LAYOUT_CACHE_SIZE", "256"))
+
+
+class LayoutCache:
+    """
+    Bounded LRU cache of data derived from room layouts, keyed by tuples
+    starting with the room_id, e.g. (ETag, JSON bytes) per (room_id,
+    include_types, compact). Requests without a room_id are cached under a None
+    room_id, whose entries are evicted by a change of any room because the
+    resolved room may differ afterwards.
+    """
+
+    def __init__(self, max_size: int = LAYOUT_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by every eviction; put() refuses entries loaded before one
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, generation: int):
+        with self._lock:
+            if generation != self.generation:
+                # A layout changed while this one was loaded, it may be stale
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_rooms(self, room_ids: List[str]):
+        """Drop the cached layouts of the given rooms and of the unnamed room"""
+        room_ids = set(room_ids) | {None}
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._entries if key[0] in room_ids]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+layout_cache = LayoutCache()
+
+
+def _evict(keys: Optional[List[str]]):
+    if keys is None:
+        layout_cache.clear()
+    else:
+        layout_cache.invalidate_rooms(keys)
+
+
+subscribe("layout", _evict)
+
+
+def get_cached_layout(
+    session: Session, room_id: Optional[UUID], include_types: bool, compact: bool = False
+) -> Tuple[str, bytes]:
+    """
+    ETag and pre-encoded JSON of a room's layout, the compact columnar one
+    if `compact` (which always includes the table types). Served from memory
+    until the room's layout version changes, so a hit does not touch the
+    database.
+    """
+    include_types = include_types or compact
+    key = (str(room_id) if room_id else None, include_types, compact)
+    entry = layout_cache.get(key)
+    if entry is not None:
+        return entry
+
+    generation = layout_cache.generation
+    room_id = resolve_room_id(session, room_id)
+    # Version first: if an edit commits in between, the ETag is older than
+    # the body and the client refetches, never the other way round
+    version = get_layout_version(session, room_id)
+    layout = get_layout(session, room_id, include_types=include_types)
+    if compact:
+        body = compact_layout(room_id, layout)
+    else:
+        schema = EnhancedLayout if include_types else Layout
+        body = schema(**layout).json().encode()
+    entry = (layout_etag(room_id, version, include_types, compact), body)
+    layout_cache.put(key, entry, generation)
+    return entry
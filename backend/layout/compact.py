@@ -0,0 +1,60 @@
+import json
+from typing import Optional
+from uuid import UUID
+
+# Accept header value that selects the compact layout representation
+COMPACT_LAYOUT_MEDIA_TYPE = "application/vnd.restaurant.layout.compact+json"
+
+TABLE_TYPE_FIELDS = ("name", "display_name", "default_width", "default_height", "default_max_guests", "color_code")
+TABLE_COLUMNS = ("id", "type_id", "table_number", "max_guests", "x", "y", "rotation", "width", "height")
+STATIC_ITEM_COLUMNS = ("id", "type", "x", "y", "rotation")
+WALL_COLUMNS = ("id", "x", "y", "rotation", "length")
+
+
+def wants_compact(accept: Optional[str]) -> bool:
+    """Whether an Accept header asks for the compact layout (and does not refuse it with q=0)"""
+    if not accept:
+        return False
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        if media_type.lower() != COMPACT_LAYOUT_MEDIA_TYPE:
+            continue
+        quality = next((param.split("=", 1)[1] for param in params if param.lower().startswith("q=")), "1")
+        try:
+            return float(quality) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def _value(value):
+    return str(value) if isinstance(value, UUID) else value
+
+
+def _columns(items, columns) -> dict:
+    return {column: [_value(getattr(item, column)) for item in items] for column in columns}
+
+
+def compact_layout(room_id: UUID, layout: dict) -> bytes:
+    """
+    Columnar JSON of a layout from get_layout(include_types=True): one array
+    per field and object kind, with item i of a kind at position i of each
+    array, and the table types used by the room sent once, by type_id.
+    A null width or height means the type's default size.
+    """
+    table_types = {}
+    for table in layout["tables"]:
+        if table.table_type is not None:
+            table_types.setdefault(table.type_id, table.table_type)
+
+    document = {
+        "room_id": str(room_id),
+        "table_types": {
+            str(type_id): {field: getattr(table_type, field) for field in TABLE_TYPE_FIELDS}
+            for type_id, table_type in sorted(table_types.items())
+        },
+        "tables": _columns(layout["tables"], TABLE_COLUMNS),
+        "static_items": _columns(layout["static_items"], STATIC_ITEM_COLUMNS),
+        "walls": _columns(layout["walls"], WALL_COLUMNS),
+    }
+    return json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode()
@@ -0,0 +1,196 @@
+"""
+Layout geometry: every table, static item and wall as a rotated rectangle.
+
+Mirrors how the editor draws the plan:
+- tables have their top-left corner at (x, y) and are sized width x height,
+  or 80 x 80 (200 x 100 for a banquet hall) when no size is stored
+- static items have their top-left corner at (x, y) and a per-type size
+- walls start at (x, y) and run `length` pixels in the direction of `rotation`
+All shapes rotate around their center, except walls, which rotate around their start.
+"""
+
+import math
+from collections import defaultdict
+from typing import Dict, List, Tuple
+import numpy as np
+
+WALL_THICKNESS = 8
+
+# Sizes the editor draws tables without a stored size with, by type name
+TABLE_SIZES = {
+    "banquet": (200, 100),
+}
+DEFAULT_TABLE_SIZE = (80, 80)
+
+STATIC_ITEM_SIZES = {
+    "bar": (120, 50),
+    "bathroom": (80, 80),
+    "wc": (80, 80),
+    "kitchen": (120, 80),
+    "wardrobe": (80, 80),
+    "window": (100, 50),
+}
+DEFAULT_STATIC_ITEM_SIZE = (80, 80)
+
+# Side of a spatial grid cell in layout pixels
+GRID_CELL_SIZE = 200
+
+
+def _table_boxes(tables: List[dict]) -> List[tuple]:
+    boxes = []
+    for table in tables:
+        table_type = table.get("table_type") or {}
+        default_width, default_height = TABLE_SIZES.get(table_type.get("name"), DEFAULT_TABLE_SIZE)
+        boxes.append((
+            table["x"], table["y"],
+            table.get("width") or default_width, table.get("height") or default_height,
+            table["rotation"]
+        ))
+    return boxes
+
+
+def _static_item_boxes(items: List[dict]) -> List[tuple]:
+    boxes = []
+    for item in items:
+        width, height = STATIC_ITEM_SIZES.get(item["type"].lower(), DEFAULT_STATIC_ITEM_SIZE)
+        boxes.append((item["x"], item["y"], width, height, item["rotation"]))
+    return boxes
+
+
+class Shapes:
+    """
+    Parallel arrays of rotated rectangles (center, half extents, rotation)
+    with the kind and serialized item each one came from
+    """
+
+    def __init__(self, layout: dict):
+        tables = layout.get("tables", [])
+        static_items = layout.get("static_items", [])
+        walls = layout.get("walls", [])
+        self.kinds: List[str] = ["table"] * len(tables) + ["static_item"] * len(static_items) + ["wall"] * len(walls)
+        self.items: List[dict] = [*tables, *static_items, *walls]
+
+        # Tables and static items: top-left corner and size
+        boxes = np.array(_table_boxes(tables) + _static_item_boxes(static_items), dtype=float).reshape(-1, 5)
+        # Walls: start, length and direction
+        lines = np.array(
+            [(wall["x"], wall["y"], wall["length"], wall["rotation"]) for wall in walls], dtype=float
+        ).reshape(-1, 4)
+
+        angles = np.radians(np.concatenate((boxes[:, 4], lines[:, 3])))
+        self.cos, self.sin = np.cos(angles), np.sin(angles)
+        half_lengths = lines[:, 2] / 2
+        wall_cos, wall_sin = self.cos[len(boxes):], self.sin[len(boxes):]
+        self.hw = np.concatenate((boxes[:, 2] / 2, half_lengths))
+        self.hh = np.concatenate((boxes[:, 3] / 2, np.full(len(lines), WALL_THICKNESS / 2)))
+        self.cx = np.concatenate((boxes[:, 0] + boxes[:, 2] / 2, lines[:, 0] + half_lengths * wall_cos))
+        self.cy = np.concatenate((boxes[:, 1] + boxes[:, 3] / 2, lines[:, 1] + half_lengths * wall_sin))
+
+        # Axis-aligned bounds of the rotated rectangles
+        extent_x = np.abs(self.hw * self.cos) + np.abs(self.hh * self.sin)
+        extent_y = np.abs(self.hw * self.sin) + np.abs(self.hh * self.cos)
+        self.xmin, self.xmax = self.cx - extent_x, self.cx + extent_x
+        self.ymin, self.ymax = self.cy - extent_y, self.cy + extent_y
+
+    def __len__(self):
+        return len(self.items)
+
+    def overlapping_bounds(self, indices: np.ndarray, x1: float, y1: float, x2: float, y2: float) -> np.ndarray:
+        """Those of `indices` whose bounds intersect the box"""
+        return indices[
+            (self.xmax[indices] >= x1) & (self.xmin[indices] <= x2)
+            & (self.ymax[indices] >= y1) & (self.ymin[indices] <= y2)
+        ]
+
+    def containing(self, indices: np.ndarray, x: float, y: float) -> np.ndarray:
+        """Those of `indices` whose rectangle contains the point"""
+        dx = x - self.cx[indices]
+        dy = y - self.cy[indices]
+        # The point in the rectangle's own (unrotated) frame
+        local_x = dx * self.cos[indices] + dy * self.sin[indices]
+        local_y = -dx * self.sin[indices] + dy * self.cos[indices]
+        return indices[(np.abs(local_x) <= self.hw[indices]) & (np.abs(local_y) <= self.hh[indices])]
+
+    def overlapping(self, i: np.ndarray, j: np.ndarray, tolerance: float = 0) -> np.ndarray:
+        """
+        Mask of the pairs (i[k], j[k]) whose rectangles overlap by more than
+        `tolerance` pixels, by the separating axis theorem: two rectangles are
+        disjoint if their projections are disjoint on one of their four edge axes.
+        """
+        dx = self.cx[j] - self.cx[i]
+        dy = self.cy[j] - self.cy[i]
+        cos_i, sin_i, cos_j, sin_j = self.cos[i], self.sin[i], self.cos[j], self.sin[j]
+        separated = np.zeros(len(i), dtype=bool)
+        for axis_x, axis_y in ((cos_i, sin_i), (-sin_i, cos_i), (cos_j, sin_j), (-sin_j, cos_j)):
+            distance = np.abs(dx * axis_x + dy * axis_y)
+            radius_i = (self.hw[i] * np.abs(cos_i * axis_x + sin_i * axis_y)
+                        + self.hh[i] * np.abs(cos_i * axis_y - sin_i * axis_x))
+            radius_j = (self.hw[j] * np.abs(cos_j * axis_x + sin_j * axis_y)
+                        + self.hh[j] * np.abs(cos_j * axis_y - sin_j * axis_x))
+            separated |= distance >= radius_i + radius_j - tolerance
+        return ~separated
+
+
+def cell_range(low: float, high: float, cell_size: int = GRID_CELL_SIZE) -> range:
+    return range(math.floor(low / cell_size), math.floor(high / cell_size) + 1)
+
+
+def grid_cells(shapes: Shapes, cell_size: int = GRID_CELL_SIZE) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Every (cell_x, cell_y, shape index) triple of a uniform grid where the
+    shape's bounds touch the cell, as three parallel arrays
+    """
+    x0 = np.floor(shapes.xmin / cell_size).astype(np.int64)
+    y0 = np.floor(shapes.ymin / cell_size).astype(np.int64)
+    columns = np.floor(shapes.xmax / cell_size).astype(np.int64) - x0 + 1
+    rows = np.floor(shapes.ymax / cell_size).astype(np.int64) - y0 + 1
+    counts = columns * rows
+
+    indices = np.repeat(np.arange(len(shapes)), counts)
+    # Position of each triple among the cells of its shape
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    columns = np.repeat(columns, counts)
+    return np.repeat(x0, counts) + offsets % columns, np.repeat(y0, counts) + offsets // columns, indices
+
+
+def build_grid(shapes: Shapes, cell_size: int = GRID_CELL_SIZE) -> Dict[Tuple[int, int], List[int]]:
+    """Uniform grid: cell -> indices of the shapes whose bounds touch it"""
+    grid = defaultdict(list)
+    for cell_x, cell_y, i in zip(*(array.tolist() for array in grid_cells(shapes, cell_size))):
+        grid[(cell_x, cell_y)].append(i)
+    return grid
+
+
+def candidate_pairs(shapes: Shapes, cell_size: int = GRID_CELL_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Broad phase: the pairs of shapes (i < j) that share a grid cell and whose
+    bounds intersect
+    """
+    cell_x, cell_y, indices = grid_cells(shapes, cell_size)
+    order = np.lexsort((indices, cell_y, cell_x))
+    cell_x, cell_y, indices = cell_x[order], cell_y[order], indices[order]
+
+    # Runs of entries with the same cell; each entry pairs with the later
+    # entries of its run, expanded with repeat like grid_cells
+    new_cell = np.ones(len(indices), dtype=bool)
+    new_cell[1:] = (cell_x[1:] != cell_x[:-1]) | (cell_y[1:] != cell_y[:-1])
+    run_starts = np.flatnonzero(new_cell)
+    run_ends = np.append(run_starts[1:], len(indices))
+    positions = np.arange(len(indices))
+    later = np.repeat(run_ends, run_ends - run_starts) - positions - 1
+    first = np.repeat(positions, later)
+    second = first + 1 + np.arange(later.sum()) - np.repeat(np.cumsum(later) - later, later)
+    i, j = indices[first], indices[second]
+
+    touching = (
+        (shapes.xmin[i] <= shapes.xmax[j]) & (shapes.xmin[j] <= shapes.xmax[i])
+        & (shapes.ymin[i] <= shapes.ymax[j]) & (shapes.ymin[j] <= shapes.ymax[i])
+    )
+    # Shapes spanning several cells meet in more than one; keep each pair in
+    # the cell holding the top-left corner of their bounds' intersection only
+    corner_x = np.floor(np.maximum(shapes.xmin[i], shapes.xmin[j]) / cell_size)
+    corner_y = np.floor(np.maximum(shapes.ymin[i], shapes.ymin[j]) / cell_size)
+    keep = touching & (corner_x == cell_x[first]) & (corner_y == cell_y[first])
+    i, j = i[keep], j[keep]
+    order = np.lexsort((j, i))
+    return i[order], j[order]
@@ -1,43 +1,39 @@
 from typing import Optional, List
 from uuid import UUID
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Query, HTTPException, status, Header, Response
 from sqlmodel import Session, select
 from db.database import get_session
+from db.invalidation import publish
 from utils.security import get_current_user, get_current_admin
 from schemas.layout import (
-    Layout, EnhancedLayout, LayoutUpdate, TableCreate, TableRead, TableFullRead,
+    Layout, EnhancedLayout, LayoutUpdate, LayoutSaveResult, LayoutPatch, LayoutPatchResult, LayoutSnapshotInfo, LayoutHit, LayoutValidation, TableCreate, TableRead, TableFullRead,
     StaticItemCreate, StaticItemRead, WallCreate, WallRead,
     TableTypeCreate, TableTypeRead, RoomCreate, RoomRead
 )
-from .services import get_layout, save_layout, add_table, add_static_item, add_wall, clear_layout
+from .services import (
+    get_layout, save_layout, validate_layout, patch_layout, add_table, add_static_item, add_wall, clear_layout, resolve_room_id,
+    set_default_room
+)
+from .versions import bump_table_type_layout_versions, get_snapshots, get_snapshot
+from .cache import layout_cache, get_cached_layout
+from .compact import COMPACT_LAYOUT_MEDIA_TYPE, wants_compact
+from .spatial import get_viewport, hit_test
 from db.models import User, TableType, Room
 from datetime import datetime
-from db.create_default_room import create_default_room
 
 router = APIRouter(tags=["layout"])
 
 # Room Management Endpoints
 @router.get("/rooms", response_model=List[RoomRead])
 def get_rooms(session: Session = Depends(get_session)):
-    rooms = session.exec(select(Room)).all()
-    if not rooms:
-        # Create a default room if none exists
-        default_room = create_default_room()
-        if default_room:
-            rooms = [default_room]
-    return rooms
+    # The default room first; it is created by `python -m db.bootstrap`
+    return session.exec(select(Room).order_by(Room.is_default.desc(), Room.created_at)).all()
 
 @router.get("/rooms/{room_id}", response_model=RoomRead)
 def get_room(room_id: UUID, session: Session = Depends(get_session)):
     room = session.get(Room, room_id)
     if not room:
-        # Try to get any room first
-        room = session.exec(select(Room)).first()
-        if not room:
-            # Create a default room if none exists
-            room = create_default_room()
-            if not room:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found and couldn't create default room")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found")
     return room
 
 @router.post("/rooms", response_model=RoomRead)
@@ -77,15 +73,100 @@ def update_room(
     session.refresh(db_room)
     return db_room
 
+@router.put("/rooms/{room_id}/default", response_model=RoomRead)
+def make_default_room(
+    room_id: UUID,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_admin)
+):
+    """Serve this room to requests that do not name one"""
+    return set_default_room(session, room_id)
+
+def _versioned_layout(
+    session: Session, room_id: Optional[UUID], include_types: bool, if_none_match: Optional[str], accept: Optional[str]
+):
+    """
+    Cached layout with an ETag of its version, or a bare 304 when the client
+    has it already. Clients that accept COMPACT_LAYOUT_MEDIA_TYPE get the
+    compact columnar representation.
+    """
+    compact = wants_compact(accept)
+    etag, body = get_cached_layout(session, room_id, include_types, compact)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    media_type = COMPACT_LAYOUT_MEDIA_TYPE if compact else "application/json"
+    return Response(content=body, media_type=media_type, headers=headers)
+
 @router.get("/", response_model=Layout)
-def get_restaurant_layout(room_id: Optional[UUID] = None, session: Session = Depends(get_session)):
-    return get_layout(session, room_id)
+def get_restaurant_layout(
+    room_id: Optional[UUID] = None,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    session: Session = Depends(get_session)
+):
+    return _versioned_layout(session, room_id, False, if_none_match, accept)
 
 @router.get("/enhanced", response_model=EnhancedLayout)
-def get_enhanced_restaurant_layout(room_id: Optional[UUID] = None, session: Session = Depends(get_session)):
-    return get_layout(session, room_id, include_types=True)
+def get_enhanced_restaurant_layout(
+    room_id: Optional[UUID] = None,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    session: Session = Depends(get_session)
+):
+    return _versioned_layout(session, room_id, True, if_none_match, accept)
+
+@router.get("/viewport", response_model=EnhancedLayout)
+def get_layout_viewport(
+    x1: float = Query(..., description="Left edge of the visible area"),
+    y1: float = Query(..., description="Top edge of the visible area"),
+    x2: float = Query(..., description="Right edge of the visible area"),
+    y2: float = Query(..., description="Bottom edge of the visible area"),
+    room_id: Optional[UUID] = None,
+    session: Session = Depends(get_session)
+):
+    """Only the layout objects that intersect the given box"""
+    return get_viewport(session, room_id, x1, y1, x2, y2)
 
-@router.post("/save", response_model=Layout)
+@router.get("/hit-test", response_model=List[LayoutHit])
+def hit_test_layout(
+    x: float,
+    y: float,
+    room_id: Optional[UUID] = None,
+    session: Session = Depends(get_session)
+):
+    """Layout objects under a point, topmost first"""
+    return hit_test(session, room_id, x, y)
+
+@router.get("/cache")
+def get_layout_cache_stats(current_user: User = Depends(get_current_admin)):
+    """Get hit/miss counters of this worker's layout cache (admin only)"""
+    return layout_cache.stats()
+
+@router.get("/snapshots", response_model=List[LayoutSnapshotInfo])
+def get_layout_snapshots(
+    room_id: Optional[UUID] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_admin)
+):
+    return get_snapshots(session, resolve_room_id(session, room_id))
+
+@router.post("/snapshots/{version}/restore", response_model=LayoutSaveResult)
+def restore_layout_snapshot(
+    version: int,
+    room_id: Optional[UUID] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_admin)
+):
+    room_id = resolve_room_id(session, room_id)
+    snapshot = get_snapshot(session, room_id, version)
+    if not snapshot:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Layout snapshot not found")
+    # Restoring is a save of the old layout, so it becomes a new version itself
+    # and is not validated: the old layout was accepted when it was saved
+    return save_layout(LayoutUpdate.parse_obj(snapshot.layout), session, room_id, validate=False)
+
+@router.post("/save", response_model=LayoutSaveResult)
 def save_restaurant_layout(
     layout: LayoutUpdate,
     room_id: Optional[UUID] = None,
@@ -96,6 +177,25 @@ def save_restaurant_layout(
     print(f"Current admin user: {current_user.email}")
     return save_layout(layout, session, room_id)
 
+@router.post("/validate", response_model=LayoutValidation)
+def validate_restaurant_layout(
+    layout: LayoutUpdate,
+    room_id: Optional[UUID] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_admin)
+):
+    """Check a layout for overlaps the way /save does, without saving it"""
+    return validate_layout(layout, session, room_id)
+
+@router.patch("/", response_model=LayoutPatchResult)
+def patch_restaurant_layout(
+    patch: LayoutPatch,
+    room_id: Optional[UUID] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_admin)
+):
+    return patch_layout(patch, session, room_id)
+
 @router.post("/tables", response_model=TableRead)
 def add_restaurant_table(
     table: TableCreate,
@@ -136,7 +236,7 @@ def get_table_types(session: Session = Depends(get_session)):
     return session.exec(select(TableType)).all()
 
 @router.get("/table-types/{type_id}", response_model=TableTypeRead)
-def get_table_type(type_id: UUID, session: Session = Depends(get_session)):
+def get_table_type(type_id: int, session: Session = Depends(get_session)):
     table_type = session.get(TableType, type_id)
     if not table_type:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table type not found")
@@ -153,13 +253,14 @@ def create_table_type(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Table type with name '{table_type.name}' already exists")
     new_type = TableType(**table_type.dict())
     session.add(new_type)
+    publish(session, "layout")
     session.commit()
     session.refresh(new_type)
     return new_type
 
 @router.put("/table-types/{type_id}", response_model=TableTypeRead)
 def update_table_type(
-    type_id: UUID,
+    type_id: int,
     table_type: TableTypeCreate,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_admin)
@@ -174,6 +275,7 @@ def update_table_type(
     for key, value in table_type.dict().items():
         setattr(db_type, key, value)
     session.add(db_type)
+    bump_table_type_layout_versions(session, type_id)
     session.commit()
     session.refresh(db_type)
     return db_type
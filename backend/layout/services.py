@@ -1,217 +1,448 @@
+import threading
+from datetime import datetime
+from typing import List, Optional
 from uuid import UUID, uuid4
+from sqlalchemy import delete, update
+from sqlalchemy.orm import joinedload
 from sqlmodel import Session, select
-from db.models import Table, StaticItem, Wall, Reservation, TableType
-from schemas.layout import LayoutUpdate, TableCreate, StaticItemCreate, WallCreate
+from db.models import Room, Table, StaticItem, Wall
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from schemas.layout import LayoutUpdate, LayoutPatch, TableCreate, StaticItemCreate, WallCreate
+from db.invalidation import publish, subscribe
+from reservations.reassignment import reassign_reservations
+from .versions import bump_layout_version, get_layout_version
+from .validation import LAYOUT_GEOMETRY_CHECKS, layout_conflicts
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Id of the default room, loaded once per worker and forgotten when the
+# "rooms" topic is published
+_default_room_id: Optional[UUID] = None
+_default_room_generation = 0
+_default_room_lock = threading.Lock()
+
+
+def _forget_default_room(keys: Optional[List[str]]):
+    global _default_room_id, _default_room_generation
+    with _default_room_lock:
+        _default_room_id = None
+        _default_room_generation += 1
+
+
+subscribe("rooms", _forget_default_room)
+
+
+def get_default_room_id(session: Session) -> UUID:
+    """Id of the room flagged as the default one"""
+    global _default_room_id
+    with _default_room_lock:
+        if _default_room_id is not None:
+            return _default_room_id
+        generation = _default_room_generation
+    
+    room_id = session.exec(select(Room.id).where(Room.is_default == True)).first()
+    if room_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Default room not found")
+    
+    with _default_room_lock:
+        # Unless the default room changed while it was loaded
+        if generation == _default_room_generation:
+            _default_room_id = room_id
+    return room_id
+
+
+def set_default_room(session: Session, room_id: UUID) -> Room:
+    """Make a room the default one, replacing the current default room"""
+    room = session.get(Room, room_id)
+    if not room:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found")
+    
+    previous = session.exec(select(Room.id).where(Room.is_default == True)).all()
+    # Two statements: the unique index allows a single default room at any time
+    session.execute(
+        update(Room).where(Room.is_default == True, Room.id != room_id).values(is_default=False)
+        .execution_options(synchronize_session=False)
+    )
+    room.is_default = True
+    room.updated_at = datetime.now()
+    session.add(room)
+    publish(session, "rooms")
+    # Cached layouts and indexes of requests without a room_id are stale
+    publish(session, "layout", [room_id, *previous])
+    session.commit()
+    session.refresh(room)
+    return room
+
+
+def resolve_room_id(session: Session, room_id: UUID = None) -> UUID:
+    """
+    Room to work on when the client does not name one: the default room
+    """
+    if room_id is None:
+        room_id = get_default_room_id(session)
+    return room_id
+
+
 def get_layout(session: Session, room_id: UUID = None, include_types: bool = False):
     """
     Get the restaurant layout (tables, static items and walls)
     """
-    if room_id is None:
-        # If no room_id is provided, get the first room's items
-        table = session.exec(select(Table).where(Table.is_active == True).limit(1)).first()
-        if table:
-            room_id = table.room_id
-        else:
-            # If no tables exist, create a default room ID
-            room_id = uuid4()
+    room_id = resolve_room_id(session, room_id)
     
     tables_query = select(Table).where(
         Table.room_id == room_id,
         Table.is_active == True
     )
     
+    # If include_types is True, return the EnhancedLayout schema that includes related type info
+    if include_types:
+        tables_query = tables_query.options(joinedload(Table.table_type))
+    
     tables = session.exec(tables_query).all()
     static_items = session.exec(select(StaticItem).where(StaticItem.room_id == room_id)).all()
     walls = session.exec(select(Wall).where(Wall.room_id == room_id)).all()
     
-    # If include_types is True, return the EnhancedLayout schema that includes related type info
-    if include_types:
-        for table in tables:
-            # Load related objects
-            if table.type_id:
-                table.table_type = session.get(TableType, table.type_id)
-    
     return {"tables": tables, "static_items": static_items, "walls": walls}
 
 
-def save_layout(layout_data: LayoutUpdate, session: Session, room_id: UUID = None):
+# Columns compared and written by save_layout
+TABLE_FIELDS = ("type_id", "table_number", "max_guests", "x", "y", "rotation", "width", "height")
+STATIC_ITEM_FIELDS = ("type", "x", "y", "rotation")
+WALL_FIELDS = ("x", "y", "rotation", "length")
+
+# Table fields that keep their stored value when sent as null
+TABLE_OPTIONAL_FIELDS = ("width", "height")
+
+
+def _diff_items(existing, incoming, fields, room_id: UUID, optional_fields=()):
     """
-    Save a new layout (replace existing)
+    Diff incoming items against the stored rows of a room by id.
+    Returns (rows to insert, rows to update, ids of stored rows not sent).
+    Items without an id, or with an id that is not stored in the room, are new.
     """
-    with session.no_autoflush:
-        if room_id is None:
-            # If no room_id is provided, get the first room's items
-            table = session.exec(select(Table).where(Table.is_active == True).limit(1)).first()
-            if table:
-                room_id = table.room_id
-            else:
-                # If no tables exist, create a default room ID
-                room_id = uuid4()
+    inserts = []
+    updates = []
+    kept_ids = set()
+    
+    for item_data in incoming:
+        values = {field: getattr(item_data, field) for field in fields}
+        stored = existing.get(item_data.id) if item_data.id else None
         
-        # Create a map of existing tables to check if we're using any existing table IDs
-        existing_tables = {}
-        tables_to_update = session.exec(select(Table).where(
+        if stored is None:
+            inserts.append({"id": uuid4(), "room_id": room_id, **values})
+            continue
+        
+        kept_ids.add(stored.id)
+        for field in optional_fields:
+            if values[field] is None:
+                values[field] = getattr(stored, field)
+        if any(getattr(stored, field) != value for field, value in values.items()):
+            updates.append({"id": stored.id, **values})
+    
+    removed_ids = [item_id for item_id in existing if item_id not in kept_ids]
+    return inserts, updates, removed_ids
+
+
+def _stored_items(session: Session, room_id: UUID):
+    """Active tables, static items and walls of a room, each as a dict by id"""
+    existing_tables = {
+        table.id: table for table in session.exec(select(Table).where(
             Table.room_id == room_id,
             Table.is_active == True
         )).all()
-        for table in tables_to_update:
-            existing_tables[str(table.id)] = table
-        
-        # Create a list of tables that we'll preserve (those that appear in the new layout)
-        preserved_table_ids = []
-
-        # Create or update tables
-        new_tables = []
-        for i, table_data in enumerate(layout_data.tables):
-            # If the table has an ID and exists, update it
-            if hasattr(table_data, 'id') and table_data.id and str(table_data.id) in existing_tables:
-                table_id = str(table_data.id)
-                existing_table = existing_tables[table_id]
-                
-                # Update basic properties
-                existing_table.type_id = table_data.type_id
-                existing_table.table_number = table_data.table_number
-                existing_table.max_guests = table_data.max_guests
-                existing_table.x = table_data.x
-                existing_table.y = table_data.y
-                existing_table.rotation = table_data.rotation
-                
-                # Update width and height if provided
-                if hasattr(table_data, 'width') and table_data.width is not None:
-                    existing_table.width = table_data.width
-                if hasattr(table_data, 'height') and table_data.height is not None:
-                    existing_table.height = table_data.height
-                
-                session.add(existing_table)
-                preserved_table_ids.append(table_id)
-                new_tables.append(existing_table)
-            else:
-                # Create a new table
-                new_table = Table(
-                    type_id=table_data.type_id,
-                    table_number=table_data.table_number,
-                    max_guests=table_data.max_guests,
-                    x=table_data.x,
-                    y=table_data.y,
-                    rotation=table_data.rotation,
-                    room_id=room_id,
-                    is_active=True
-                )
-                
-                # Set additional properties if provided
-                if hasattr(table_data, 'width') and table_data.width is not None:
-                    new_table.width = table_data.width
-                if hasattr(table_data, 'height') and table_data.height is not None:
-                    new_table.height = table_data.height
-                
-                session.add(new_table)
-                new_tables.append(new_table)
-        
-        # Commit tables first so they have IDs
-        session.flush()
-        
-        # Mark tables as inactive instead of deleting them
-        tables_to_mark_inactive = []
-        for table_id, table in existing_tables.items():
-            if table_id not in preserved_table_ids:
-                tables_to_mark_inactive.append(table)
-        
-        # Handle reservations for tables that will be marked inactive
-        if tables_to_mark_inactive:
-            # First, get all affected reservations
-            affected_reservations = []
-            for table in tables_to_mark_inactive:
-                reservations = session.exec(
-                    select(Reservation).where(Reservation.table_id == table.id)
-                ).all()
-                affected_reservations.extend(reservations)
-            
-            # Then handle each reservation
-            for reservation in affected_reservations:
-                table_found = False
-                # Try to find a suitable table
-                if new_tables:
-                    for new_table in new_tables:
-                        if new_table.max_guests >= reservation.guests_count:
-                            reservation.table_id = new_table.id
-                            session.add(reservation)
-                            table_found = True
-                            break
-                
-                # If no suitable table found and there are any tables, assign to the largest one
-                if not table_found and new_tables:
-                    # Sort by max_guests descending
-                    sorted_tables = sorted(new_tables, key=lambda t: t.max_guests, reverse=True)
-                    reservation.table_id = sorted_tables[0].id
-                    session.add(reservation)
-                else:
-                    # If no tables at all, we have to delete the reservation
-                    if not new_tables:
-                        session.delete(reservation)
-        
-        # Flush changes to avoid issues with the next operations
-        session.flush()
-        
-        # Now mark tables as inactive instead of deleting them
-        for table in tables_to_mark_inactive:
-            table.is_active = False
-            session.add(table)
+    }
+    existing_static_items = {
+        item.id: item for item in session.exec(select(StaticItem).where(StaticItem.room_id == room_id)).all()
+    }
+    existing_walls = {
+        wall.id: wall for wall in session.exec(select(Wall).where(Wall.room_id == room_id)).all()
+    }
+    return existing_tables, existing_static_items, existing_walls
+
+
+def _save_conflicts(session: Session, layout_data: LayoutUpdate, stored, diffs):
+    """Geometry conflicts of a layout about to be saved over the stored one"""
+    unchanged = set()
+    for kind, existing, (_, updates, removed_ids) in zip(("table", "static_item", "wall"), stored, diffs):
+        changed_ids = {row["id"] for row in updates} | set(removed_ids)
+        unchanged.update((kind, item_id) for item_id in existing if item_id not in changed_ids)
+    return layout_conflicts(
+        session, layout_data.tables, layout_data.static_items, layout_data.walls,
+        stored_tables=stored[0], unchanged=unchanged
+    )
+
+
+def _conflict_error(conflicts):
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail={"message": "Layout objects overlap or are out of bounds", "conflicts": conflicts}
+    )
+
+
+def validate_layout(layout_data: LayoutUpdate, session: Session, room_id: UUID = None):
+    """Geometry conflicts save_layout() would reject the layout for, without saving it"""
+    room_id = resolve_room_id(session, room_id)
+    stored = _stored_items(session, room_id)
+    diffs = [
+        _diff_items(existing, incoming, fields, room_id, optional_fields)
+        for existing, incoming, fields, optional_fields in zip(
+            stored,
+            (layout_data.tables, layout_data.static_items, layout_data.walls),
+            (TABLE_FIELDS, STATIC_ITEM_FIELDS, WALL_FIELDS),
+            (TABLE_OPTIONAL_FIELDS, (), ())
+        )
+    ]
+    conflicts = _save_conflicts(session, layout_data, stored, diffs)
+    return {"valid": not conflicts, "conflicts": conflicts}
+
+
+def save_layout(layout_data: LayoutUpdate, session: Session, room_id: UUID = None, validate: bool = True):
+    """
+    Save a new layout, writing only the differences against the stored one.
+    Tables missing from the new layout are marked inactive, static items and
+    walls missing from it are deleted. Unless `validate` is off, a layout
+    whose changed objects overlap others is rejected with its conflicts.
+    """
+    room_id = resolve_room_id(session, room_id)
+    
+    stored = _stored_items(session, room_id)
+    existing_tables, existing_static_items, existing_walls = stored
+    
+    tables_added, tables_updated, tables_removed = _diff_items(
+        existing_tables, layout_data.tables, TABLE_FIELDS, room_id, TABLE_OPTIONAL_FIELDS
+    )
+    items_added, items_updated, items_removed = _diff_items(
+        existing_static_items, layout_data.static_items, STATIC_ITEM_FIELDS, room_id
+    )
+    walls_added, walls_updated, walls_removed = _diff_items(
+        existing_walls, layout_data.walls, WALL_FIELDS, room_id
+    )
+    
+    if validate and LAYOUT_GEOMETRY_CHECKS:
+        conflicts = _save_conflicts(session, layout_data, stored, (
+            (tables_added, tables_updated, tables_removed),
+            (items_added, items_updated, items_removed),
+            (walls_added, walls_updated, walls_removed),
+        ))
+        if conflicts:
+            raise _conflict_error(conflicts)
+    
+    # Bulk statements for what changed only
+    if tables_added:
+        session.bulk_insert_mappings(Table, [{**row, "is_active": True} for row in tables_added])
+    if tables_updated:
+        session.bulk_update_mappings(Table, tables_updated)
+    if items_added:
+        session.bulk_insert_mappings(StaticItem, items_added)
+    if items_updated:
+        session.bulk_update_mappings(StaticItem, items_updated)
+    if items_removed:
+        session.execute(delete(StaticItem).where(StaticItem.id.in_(items_removed)))
+    if walls_added:
+        session.bulk_insert_mappings(Wall, walls_added)
+    if walls_updated:
+        session.bulk_update_mappings(Wall, walls_updated)
+    if walls_removed:
+        session.execute(delete(Wall).where(Wall.id.in_(walls_removed)))
+    
+    reassignment = {"moved": [], "unplaceable": []}
+    if tables_removed:
+        # Move reservations off the removed tables before marking them inactive
+        reassignment = reassign_reservations(session, tables_removed, room_id)
         
-        # Delete static items
-        static_items_to_delete = session.exec(select(StaticItem).where(StaticItem.room_id == room_id)).all()
-        for item in static_items_to_delete:
-            session.delete(item)
+        session.execute(
+            update(Table).where(Table.id.in_(tables_removed)).values(is_active=False)
+        )
+    
+    changes = {
+        "tables": {"added": len(tables_added), "updated": len(tables_updated), "removed": len(tables_removed)},
+        "static_items": {"added": len(items_added), "updated": len(items_updated), "removed": len(items_removed)},
+        "walls": {"added": len(walls_added), "updated": len(walls_updated), "removed": len(walls_removed)},
+    }
+    if any(any(counts.values()) for counts in changes.values()):
+        version = bump_layout_version(session, room_id, snapshot=True)
+    else:
+        version = get_layout_version(session, room_id)
+    if any(changes["tables"].values()):
+        # Tables and reservations may have moved, so every date is stale
+        publish(session, "availability")
+    
+    session.commit()
+    
+    return {**get_layout(session, room_id), "changes": changes, "version": version, "reassignment": reassignment}
+
+
+# Model, schema of "add" operations and resizable fields per PATCH item kind
+PATCH_KINDS = {
+    "table": (Table, TableCreate, ("width", "height")),
+    "static_item": (StaticItem, StaticItemCreate, ()),
+    "wall": (Wall, WallCreate, ("length",)),
+}
+PATCH_FIELDS = {
+    "move": ("x", "y"),
+    "rotate": ("rotation",),
+}
+
+
+def _patch_error(index: int, message: str, status_code=status.HTTP_400_BAD_REQUEST):
+    return HTTPException(status_code=status_code, detail=f"Operation {index}: {message}")
+
+
+def patch_layout(patch: LayoutPatch, session: Session, room_id: UUID = None):
+    """
+    Apply a batch of move/rotate/resize/add/remove operations to a room's
+    layout in one transaction. Either every operation is applied or none.
+    """
+    room_id = resolve_room_id(session, room_id)
+    
+    for index, operation in enumerate(patch.operations):
+        if operation.kind not in PATCH_KINDS:
+            raise _patch_error(index, f"unknown item kind '{operation.kind}'")
+        if operation.op not in ("move", "rotate", "resize", "add", "remove"):
+            raise _patch_error(index, f"unknown operation '{operation.op}'")
+        if operation.op == "add" and operation.item is None:
+            raise _patch_error(index, "'item' is required to add an item")
+        if operation.op != "add" and operation.id is None:
+            raise _patch_error(index, "'id' is required")
+    
+    new_items = {}
+    for index, operation in enumerate(patch.operations):
+        if operation.op == "add":
+            try:
+                new_items[index] = PATCH_KINDS[operation.kind][1].parse_obj(operation.item)
+            except ValidationError as e:
+                raise _patch_error(index, f"invalid item: {e}")
+    
+    # Load every referenced stored item with one query per kind, and the ids
+    # given to added items that are taken already, in any room
+    items = {}
+    taken = set()
+    for kind, (model, _, _) in PATCH_KINDS.items():
+        ids = {op.id for op in patch.operations if op.kind == kind and op.op != "add"}
+        if ids:
+            query = select(model).where(model.id.in_(ids), model.room_id == room_id)
+            if model is Table:
+                query = query.where(Table.is_active == True)
+            items.update({(kind, item.id): item for item in session.exec(query).all()})
         
-        # Delete walls
-        walls_to_delete = session.exec(select(Wall).where(Wall.room_id == room_id)).all()
-        for wall in walls_to_delete:
-            session.delete(wall)
+        new_ids = {
+            item_data.id for index, item_data in new_items.items()
+            if patch.operations[index].kind == kind and item_data.id is not None
+        }
+        if new_ids:
+            taken.update((kind, item_id) for item_id in session.exec(select(model.id).where(model.id.in_(new_ids))).all())
+    
+    added = {}
+    updated = set()
+    removed = {}
+    
+    for index, operation in enumerate(patch.operations):
+        model, _, resizable = PATCH_KINDS[operation.kind]
         
-        # Create new static items
-        for item_data in layout_data.static_items:
-            new_item = StaticItem(
-                type=item_data.type,
-                x=item_data.x,
-                y=item_data.y,
-                rotation=item_data.rotation,
-                room_id=room_id
-            )
+        if operation.op == "add":
+            item_data = new_items[index]
+            new_item = model(**item_data.dict(exclude_unset=True, exclude_none=True), room_id=room_id)
+            key = (operation.kind, new_item.id)
+            if key in items or key in removed or key in taken:
+                raise _patch_error(index, "an item with this id already exists", status.HTTP_409_CONFLICT)
             session.add(new_item)
+            items[key] = new_item
+            added[key] = new_item
+            continue
         
-        # Create new walls
-        for wall_data in layout_data.walls:
-            new_wall = Wall(
-                x=wall_data.x,
-                y=wall_data.y,
-                rotation=wall_data.rotation,
-                length=wall_data.length,
-                room_id=room_id
-            )
-            session.add(new_wall)
+        key = (operation.kind, operation.id)
+        item = items.get(key)
+        if item is None:
+            raise _patch_error(index, f"{operation.kind} {operation.id} not found", status.HTTP_404_NOT_FOUND)
         
-        # Now commit everything
-        session.commit()
+        if operation.op == "remove":
+            items.pop(key)
+            updated.discard(key)
+            if key in added:
+                # Added in this batch, so it was never stored
+                session.expunge(added.pop(key))
+            else:
+                removed[key] = item
+            continue
         
-        return get_layout(session, room_id)
+        fields = resizable if operation.op == "resize" else PATCH_FIELDS[operation.op]
+        if not fields:
+            raise _patch_error(index, f"a {operation.kind} cannot be resized")
+        values = {field: getattr(operation, field) for field in fields if getattr(operation, field) is not None}
+        if not values:
+            raise _patch_error(index, f"'{operation.op}' needs one of: {', '.join(fields)}")
+        for field, value in values.items():
+            setattr(item, field, value)
+        if key not in added:
+            updated.add(key)
+    
+    for (kind, _), item in removed.items():
+        if kind != "table":
+            session.delete(item)
+    session.flush()
+    
+    removed_tables = [item_id for kind, item_id in removed if kind == "table"]
+    if LAYOUT_GEOMETRY_CHECKS and (added or updated):
+        # Check the resulting room, reporting conflicts of the touched items only
+        tables = session.exec(select(Table).where(
+            Table.room_id == room_id,
+            Table.is_active == True,
+            Table.id.notin_(removed_tables)
+        )).all()
+        static_items = session.exec(select(StaticItem).where(StaticItem.room_id == room_id)).all()
+        walls = session.exec(select(Wall).where(Wall.room_id == room_id)).all()
+        unchanged = {
+            (kind, item.id)
+            for kind, kind_items in (("table", tables), ("static_item", static_items), ("wall", walls))
+            for item in kind_items
+        } - set(added) - updated
+        conflicts = layout_conflicts(session, tables, static_items, walls, unchanged=unchanged)
+        if conflicts:
+            raise _conflict_error(conflicts)
+    
+    reassignment = {"moved": [], "unplaceable": []}
+    if removed_tables:
+        # Move reservations off the removed tables before marking them inactive
+        reassignment = reassign_reservations(session, removed_tables, room_id)
+        for (kind, _), item in removed.items():
+            if kind == "table":
+                item.is_active = False
+    
+    changes = {
+        f"{kind}s": {
+            "added": sum(1 for key in added if key[0] == kind),
+            "updated": sum(1 for key in updated if key[0] == kind),
+            "removed": sum(1 for key in removed if key[0] == kind),
+        }
+        for kind in PATCH_KINDS
+    }
+    
+    if added or updated or removed:
+        version = bump_layout_version(session, room_id)
+    else:
+        version = get_layout_version(session, room_id)
+    if changes["tables"]["added"] or changes["tables"]["removed"]:
+        # Moving a table does not change availability, adding or removing one does
+        publish(session, "availability")
+    
+    session.commit()
+    
+    return {
+        "changes": changes,
+        "added_ids": [item_id for _, item_id in added],
+        "version": version,
+        "reassignment": reassignment
+    }
 
 
 def add_table(table_data: TableCreate, session: Session, room_id: UUID = None):
     """
     Add a single table to the layout
     """
-    if room_id is None:
-        # If no room_id is provided, get the first room's items
-        existing_table = session.exec(select(Table).where(Table.is_active == True).limit(1)).first()
-        if existing_table:
-            room_id = existing_table.room_id
-        else:
-            # If no tables exist, create a default room ID
-            room_id = uuid4()
+    room_id = resolve_room_id(session, room_id)
     
     new_table = Table(
         type_id=table_data.type_id,
@@ -231,6 +462,8 @@ def add_table(table_data: TableCreate, session: Session, room_id: UUID = None):
         new_table.height = table_data.height
     
     session.add(new_table)
+    bump_layout_version(session, room_id)
+    publish(session, "availability")
     session.commit()
     session.refresh(new_table)
     
@@ -241,14 +474,7 @@ def add_static_item(item_data: StaticItemCreate, session: Session, room_id: UUID
     """
     Add a single static item to the layout
     """
-    if room_id is None:
-        # If no room_id is provided, get the first room's items
-        table = session.exec(select(Table).where(Table.is_active == True).limit(1)).first()
-        if table:
-            room_id = table.room_id
-        else:
-            # If no tables exist, create a default room ID
-            room_id = uuid4()
+    room_id = resolve_room_id(session, room_id)
     
     new_item = StaticItem(
         type=item_data.type,
@@ -259,6 +485,7 @@ def add_static_item(item_data: StaticItemCreate, session: Session, room_id: UUID
     )
     
     session.add(new_item)
+    bump_layout_version(session, room_id)
     session.commit()
     session.refresh(new_item)
     
@@ -269,14 +496,7 @@ def add_wall(wall_data: WallCreate, session: Session, room_id: UUID = None):
     """
     Add a single wall to the layout
     """
-    if room_id is None:
-        # If no room_id is provided, get the first room's items
-        table = session.exec(select(Table).where(Table.is_active == True).limit(1)).first()
-        if table:
-            room_id = table.room_id
-        else:
-            # If no tables exist, create a default room ID
-            room_id = uuid4()
+    room_id = resolve_room_id(session, room_id)
     
     new_wall = Wall(
         x=wall_data.x,
@@ -287,6 +507,7 @@ def add_wall(wall_data: WallCreate, session: Session, room_id: UUID = None):
     )
     
     session.add(new_wall)
+    bump_layout_version(session, room_id)
     session.commit()
     session.refresh(new_wall)
     
@@ -297,21 +518,9 @@ def clear_layout(session: Session, room_id: UUID = None):
     """
     Clear the entire restaurant layout
     """
+    room_id = resolve_room_id(session, room_id)
+    
     try:
-        if room_id is None:
-            # If no room_id is provided, get the first room's items
-            try:
-                table = session.exec(select(Table).where(Table.is_active == True).limit(1)).first()
-                if table:
-                    room_id = table.room_id
-                else:
-                    # If no tables exist, create a default room ID
-                    room_id = uuid4()
-            except Exception as e:
-                # If there's a database schema error, just use a default UUID
-                logger.error(f"Error retrieving tables: {str(e)}")
-                room_id = uuid4()
-        
         try:
             # Mark tables as inactive instead of deleting them
             tables = session.exec(select(Table).where(
@@ -344,6 +553,8 @@ def clear_layout(session: Session, room_id: UUID = None):
             logger.error(f"Error deleting walls: {str(e)}")
             pass
         
+        bump_layout_version(session, room_id, snapshot=True)
+        publish(session, "availability")
         session.commit()
         
         return {"tables": [], "static_items": [], "walls": []}
@@ -0,0 +1,110 @@
+import os
+from typing import List, Optional
+from uuid import UUID
+import numpy as np
+from sqlmodel import Session
+from db.invalidation import subscribe
+from schemas.layout import EnhancedLayout
+from .cache import LayoutCache
+from .geometry import GRID_CELL_SIZE, Shapes, build_grid, cell_range
+from .services import get_layout, resolve_room_id
+
+# Maximum number of cached room indexes per worker
+SPATIAL_CACHE_SIZE = int(os.getenv("SPATIAL_CACHE_SIZE", "64"))
+
+# Hit-test order: what is drawn on top comes first
+HIT_ORDER = {"wall": 0, "table": 1, "static_item": 2}
+
+
+class SpatialIndex:
+    """Uniform grid over the rotated bounding boxes of a room's layout objects"""
+
+    def __init__(self, layout: dict, cell_size: int = GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.shapes = Shapes(layout)
+        self.grid = {
+            cell: np.array(indices, dtype=np.int64)
+            for cell, indices in build_grid(self.shapes, cell_size).items()
+        }
+        # Extent of the occupied cells, in layout pixels
+        cells = np.array(list(self.grid), dtype=np.int64).reshape(-1, 2)
+        self.bounds = (
+            cells[:, 0].min() * cell_size, cells[:, 1].min() * cell_size,
+            (cells[:, 0].max() + 1) * cell_size, (cells[:, 1].max() + 1) * cell_size
+        ) if len(cells) else None
+
+    def _candidates(self, x1: float, y1: float, x2: float, y2: float) -> np.ndarray:
+        cells = [
+            self.grid[(cell_x, cell_y)]
+            for cell_x in cell_range(x1, x2, self.cell_size)
+            for cell_y in cell_range(y1, y2, self.cell_size)
+            if (cell_x, cell_y) in self.grid
+        ]
+        if not cells:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(cells))
+
+    def query_bbox(self, x1: float, y1: float, x2: float, y2: float) -> np.ndarray:
+        """Indices of the objects whose bounds intersect the box"""
+        x1, x2 = min(x1, x2), max(x1, x2)
+        y1, y2 = min(y1, y2), max(y1, y2)
+        if self.bounds is None:
+            return np.empty(0, dtype=np.int64)
+        # A huge viewport would visit many empty cells; clamp it to the grid
+        x1, y1 = max(x1, self.bounds[0]), max(y1, self.bounds[1])
+        x2, y2 = min(x2, self.bounds[2]), min(y2, self.bounds[3])
+        if x1 > x2 or y1 > y2:
+            return np.empty(0, dtype=np.int64)
+        return self.shapes.overlapping_bounds(self._candidates(x1, y1, x2, y2), x1, y1, x2, y2)
+
+    def hit_test(self, x: float, y: float) -> np.ndarray:
+        """Indices of the objects whose rectangle contains the point"""
+        return self.shapes.containing(self._candidates(x, y, x, y), x, y)
+
+    def items(self, indices) -> dict:
+        """Serialized layout restricted to the given objects"""
+        layout = {"tables": [], "static_items": [], "walls": []}
+        for i in sorted(indices):
+            layout[f"{self.shapes.kinds[i]}s"].append(self.shapes.items[i])
+        return layout
+
+
+spatial_cache = LayoutCache(max_size=SPATIAL_CACHE_SIZE)
+
+
+def _evict(keys: Optional[List[str]]):
+    if keys is None:
+        spatial_cache.clear()
+    else:
+        spatial_cache.invalidate_rooms(keys)
+
+
+subscribe("layout", _evict)
+
+
+def get_spatial_index(session: Session, room_id: Optional[UUID]) -> SpatialIndex:
+    """The room's spatial index, rebuilt only after its layout changes"""
+    key = (str(room_id) if room_id else None, "grid")
+    index = spatial_cache.get(key)
+    if index is not None:
+        return index
+
+    generation = spatial_cache.generation
+    room_id = resolve_room_id(session, room_id)
+    layout = EnhancedLayout(**get_layout(session, room_id, include_types=True))
+    index = SpatialIndex(layout.dict())
+    spatial_cache.put(key, index, generation)
+    return index
+
+
+def get_viewport(session: Session, room_id: Optional[UUID], x1: float, y1: float, x2: float, y2: float) -> dict:
+    """Layout objects that are at least partly inside the viewport box"""
+    index = get_spatial_index(session, room_id)
+    return index.items(index.query_bbox(x1, y1, x2, y2))
+
+
+def hit_test(session: Session, room_id: Optional[UUID], x: float, y: float) -> List[dict]:
+    """Layout objects under a point, topmost first"""
+    index = get_spatial_index(session, room_id)
+    hits = sorted(index.hit_test(x, y), key=lambda i: HIT_ORDER[index.shapes.kinds[i]])
+    return [{"kind": index.shapes.kinds[i], "item": index.shapes.items[i]} for i in hits]
@@ -0,0 +1,151 @@
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+import numpy as np
+from sqlmodel import Session, select
+from db.invalidation import subscribe
+from db.models import TableType
+from .geometry import Shapes, candidate_pairs
+
+# Reject layout saves with overlapping objects
+LAYOUT_GEOMETRY_CHECKS = os.getenv("LAYOUT_GEOMETRY_CHECKS", "true").lower() == "true"
+
+# Objects must stay within [0, LAYOUT_MAX_SIZE] on both axes
+LAYOUT_MAX_SIZE = int(os.getenv("LAYOUT_MAX_SIZE", "5000"))
+
+# Overlaps up to this many pixels are allowed: touching edges are fine
+OVERLAP_TOLERANCE = 1
+
+
+def find_conflicts(layout: dict, unchanged: Set[Tuple[str, Optional[UUID]]] = frozenset()) -> List[dict]:
+    """
+    Geometry conflicts of a layout (lists of table, static item and wall
+    dicts, as in Shapes):
+    - "overlap": two tables or static items overlap
+    - "wall": a table crosses a wall
+    - "bounds": a table or static item lies outside the layout area
+    Walls may overlap each other and static items, since windows sit on walls
+    and walls meet at corners. Conflicts between `unchanged` (kind, id) items
+    only are left out, so a layout saved before these checks stays editable.
+    """
+    shapes = Shapes(layout)
+    if not len(shapes):
+        return []
+
+    # Shapes are ordered tables, static items, walls
+    counts = np.array([shapes.kinds.count(kind) for kind in ("table", "static_item", "wall")])
+    starts = np.cumsum(counts) - counts
+    order = np.arange(len(shapes))
+    is_table = order < starts[1]
+    is_wall = order >= starts[2]
+    # Position of every shape within its own list
+    positions = order - np.repeat(starts, counts)
+    if unchanged:
+        changed = np.array([(kind, item.get("id")) not in unchanged for kind, item in zip(shapes.kinds, shapes.items)])
+    else:
+        changed = np.ones(len(shapes), dtype=bool)
+
+    def describe(i):
+        item_id = shapes.items[i].get("id")
+        return {"kind": shapes.kinds[i], "index": int(positions[i]), "id": str(item_id) if item_id else None}
+
+    conflicts = []
+
+    outside = ~is_wall & changed & (
+        (shapes.xmin < -OVERLAP_TOLERANCE) | (shapes.ymin < -OVERLAP_TOLERANCE)
+        | (shapes.xmax > LAYOUT_MAX_SIZE + OVERLAP_TOLERANCE) | (shapes.ymax > LAYOUT_MAX_SIZE + OVERLAP_TOLERANCE)
+    )
+    conflicts.extend({"type": "bounds", "items": [describe(i)]} for i in np.flatnonzero(outside))
+
+    i, j = candidate_pairs(shapes)
+    # A wall is always j, by the order of the shapes
+    checked = (changed[i] | changed[j]) & ~is_wall[i] & (~is_wall[j] | is_table[i])
+    i, j = i[checked], j[checked]
+    overlapping = shapes.overlapping(i, j, OVERLAP_TOLERANCE)
+    i, j = i[overlapping], j[overlapping]
+    conflicts.extend(
+        {"type": "wall" if is_wall[b] else "overlap", "items": [describe(a), describe(b)]}
+        for a, b in zip(i.tolist(), j.tolist())
+    )
+    return conflicts
+
+
+# Table type names by id (their default table sizes), loaded once per worker
+# and forgotten when a table type changes, which publishes "layout" without keys
+_type_names: Dict[int, dict] = {}
+_type_names_generation = 0
+_type_names_lock = threading.Lock()
+
+
+def _forget_type_names(keys: Optional[List[str]]):
+    global _type_names, _type_names_generation
+    if keys is None:
+        with _type_names_lock:
+            _type_names = {}
+            _type_names_generation += 1
+
+
+subscribe("layout", _forget_type_names)
+
+
+def _table_type_names(session: Session, type_ids: Set[int]) -> Dict[int, dict]:
+    """Type names of the given type ids, reloaded when one of them is unknown"""
+    global _type_names
+    with _type_names_lock:
+        if type_ids <= _type_names.keys():
+            return _type_names
+        generation = _type_names_generation
+    
+    type_names = {
+        type_id: {"name": name}
+        for type_id, name in session.exec(select(TableType.id, TableType.name)).all()
+    }
+    
+    with _type_names_lock:
+        # Unless a table type changed while they were loaded
+        if generation == _type_names_generation:
+            _type_names = type_names
+    return type_names
+
+
+def layout_conflicts(
+    session: Session,
+    tables,
+    static_items,
+    walls,
+    stored_tables: Optional[Dict[UUID, object]] = None,
+    unchanged: Set[Tuple[str, Optional[UUID]]] = frozenset()
+) -> List[dict]:
+    """
+    find_conflicts() for schema or model objects. Tables without a size get
+    their stored size (`stored_tables` by id), then the size the editor draws
+    their type with.
+    """
+    type_names = _table_type_names(session, {table.type_id for table in tables})
+    stored_tables = stored_tables or {}
+
+    table_rows = []
+    for table in tables:
+        stored = stored_tables.get(table.id)
+        table_rows.append({
+            "id": table.id,
+            "x": table.x,
+            "y": table.y,
+            "rotation": table.rotation,
+            "width": table.width or (stored.width if stored else None),
+            "height": table.height or (stored.height if stored else None),
+            "table_type": type_names.get(table.type_id),
+        })
+    layout = {
+        "tables": table_rows,
+        "static_items": [
+            {"id": item.id, "type": item.type, "x": item.x, "y": item.y, "rotation": item.rotation}
+            for item in static_items
+        ],
+        "walls": [
+            {"id": wall.id, "x": wall.x, "y": wall.y, "rotation": wall.rotation, "length": wall.length}
+            for wall in walls
+        ],
+    }
+    return find_conflicts(layout, unchanged)
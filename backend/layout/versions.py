@@ -0,0 +1,117 @@
+import json
+import os
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+from db.invalidation import publish
+from db.models import LayoutSnapshot, Room, StaticItem, Table, Wall
+from schemas.layout import Layout
+
+# Number of layout snapshots kept per room for rollbacks
+LAYOUT_SNAPSHOTS_KEEP = int(os.getenv("LAYOUT_SNAPSHOTS_KEEP", "50"))
+
+
+def _layout_document(session: Session, room_id: UUID) -> dict:
+    """The room's current layout as plain JSON data"""
+    # Bulk updates of the layout save bypass the session's copies
+    fresh = {"populate_existing": True}
+    layout = Layout(
+        tables=session.exec(
+            select(Table).where(Table.room_id == room_id, Table.is_active == True).execution_options(**fresh)
+        ).all(),
+        static_items=session.exec(
+            select(StaticItem).where(StaticItem.room_id == room_id).execution_options(**fresh)
+        ).all(),
+        walls=session.exec(select(Wall).where(Wall.room_id == room_id).execution_options(**fresh)).all()
+    )
+    return json.loads(layout.json())
+
+
+def bump_layout_version(session: Session, room_id: UUID, snapshot: bool = False) -> int:
+    """
+    Record a change of the room's layout in the current transaction: bump
+    rooms.layout_version and invalidate cached copies. With `snapshot`, also
+    store the new layout for rollbacks; only whole-layout saves do, so the
+    editor's frequent small PATCHes neither serialize the room nor push
+    older snapshots out. The row lock taken by the UPDATE orders concurrent
+    edits of the same room. Returns the new version (0 for an unknown room).
+    """
+    session.flush()
+    version = session.execute(
+        update(Room)
+        .where(Room.id == room_id)
+        .values(layout_version=Room.layout_version + 1, updated_at=datetime.now())
+        .returning(Room.layout_version)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+    publish(session, "layout", [room_id])
+    if version is None or not snapshot:
+        return version or 0
+
+    session.add(LayoutSnapshot(room_id=room_id, version=version, layout=_layout_document(session, room_id)))
+    # Snapshot versions have gaps, so the oldest kept one is found by position
+    oldest_kept = session.exec(
+        select(LayoutSnapshot.version)
+        .where(LayoutSnapshot.room_id == room_id)
+        .order_by(LayoutSnapshot.version.desc())
+        .offset(LAYOUT_SNAPSHOTS_KEEP - 1)
+        .limit(1)
+    ).first()
+    if oldest_kept is not None:
+        session.execute(
+            delete(LayoutSnapshot).where(LayoutSnapshot.room_id == room_id, LayoutSnapshot.version < oldest_kept)
+        )
+    return version
+
+
+def bump_table_type_layout_versions(session: Session, type_id: int):
+    """
+    Record a change of a table type in the current transaction: its sizes
+    and names are part of the rendered layouts, so every room with active
+    tables of the type gets a new layout version (and ETag)
+    """
+    room_ids = session.exec(
+        select(Table.room_id).where(Table.type_id == type_id, Table.is_active == True).distinct()
+    ).all()
+    for room_id in room_ids:
+        bump_layout_version(session, room_id)
+    # Also drops cached layouts of requests without a room_id
+    publish(session, "layout")
+
+
+def get_layout_version(session: Session, room_id: UUID) -> int:
+    """Current layout version of a room (0 if it was never edited or does not exist)"""
+    version = session.exec(select(Room.layout_version).where(Room.id == room_id)).first()
+    return version or 0
+
+
+def layout_etag(room_id: UUID, version: int, include_types: bool = False, compact: bool = False) -> str:
+    """ETag of a layout representation: changes with the room's layout version"""
+    suffix = "-compact" if compact else "-types" if include_types else ""
+    return f'"{room_id}-{version}{suffix}"'
+
+
+def get_snapshots(session: Session, room_id: UUID):
+    """Stored versions of a room's layout, newest first"""
+    snapshots = session.exec(
+        select(LayoutSnapshot)
+        .where(LayoutSnapshot.room_id == room_id)
+        .order_by(LayoutSnapshot.version.desc())
+    ).all()
+    return [
+        {
+            "version": snapshot.version,
+            "created_at": snapshot.created_at,
+            "tables": len(snapshot.layout["tables"]),
+            "static_items": len(snapshot.layout["static_items"]),
+            "walls": len(snapshot.layout["walls"])
+        }
+        for snapshot in snapshots
+    ]
+
+
+def get_snapshot(session: Session, room_id: UUID, version: int) -> Optional[LayoutSnapshot]:
+    return session.get(LayoutSnapshot, (room_id, version))
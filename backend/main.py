@@ -18,7 +18,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv()
 
 # Import database
-from db.database import create_db_and_tables
+from db.bootstrap import check_schema_version
 from db.models import User
 
 # Import routers - use relative imports
@@ -36,8 +36,7 @@ from db.database import get_session
 from auth.services import register_user, login_user
 from utils.security import get_current_user, oauth2_scheme
 
-from db.init_table_types import init_table_types
-from db.create_default_room import create_default_room
+from db.invalidation import start_listener, stop_listener
 
 auth_router = APIRouter()
 
@@ -116,13 +115,18 @@ app.mount("/uploads", StaticFiles(directory=os.path.join("frontend", "public", "
 def read_root():
     return {"message": "Welcome to Restaurant Reservation API"}
 
-# Initialize the database at startup
+# Migrations and seeding run once per deployment (python -m db.bootstrap),
+# each worker only checks that the schema is current
 @app.on_event("startup")
 def on_startup():
-    logger.info("Initializing database...")
-    create_db_and_tables()
-    init_table_types()
-    create_default_room()
+    logger.info("Checking database schema version...")
+    check_schema_version()
+    start_listener()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    stop_listener()
 
 
 if __name__ == "__main__":
@@ -1,19 +1,20 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlmodel import Session
 from db.database import get_session
 from utils.security import get_current_user, get_current_admin
+from utils.stats import parse_stats_range
 from db.models import User
 from schemas.menu import (
     Menu, CategoryCreate, CategoryRead, 
     MenuItemCreate, MenuItemRead, OrderItemCreate, OrderItemRead,
-    OrderStats
+    OrderStats, OrderStatsSeries
 )
 from .services import (
     get_menu, create_category, update_category, delete_category,
     create_menu_item, update_menu_item, delete_menu_item, add_order_item,
-    get_order_statistics
+    get_order_statistics, get_order_series
 )
 
 router = APIRouter()
@@ -106,4 +107,17 @@ def get_menu_stats(
     session: Session = Depends(get_session)
 ):
     """Get order statistics for menu items (admin only)"""
-    return get_order_statistics(session) 
\ No newline at end of file
+    return get_order_statistics(session)
+
+
+@router.get("/stats/series", response_model=OrderStatsSeries)
+def get_menu_stats_series(
+    start: Optional[str] = Query(None, alias="from", description="First date of the range (YYYY-MM-DD), defaults to 30 days before `to`"),
+    end: Optional[str] = Query(None, alias="to", description="Last date of the range (YYYY-MM-DD), defaults to today"),
+    bucket: str = Query("day", description="Bucket size (day, week, month)"),
+    current_user: User = Depends(get_current_admin),
+    session: Session = Depends(get_session)
+):
+    """Get items sold and revenue per menu item and category over time (admin only)"""
+    start_date, end_date, bucket = parse_stats_range(start, end, bucket)
+    return get_order_series(start_date, end_date, bucket, session)
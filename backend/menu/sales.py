@@ -0,0 +1,34 @@
+from uuid import UUID
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select, func
+from db.models import MenuItemSales, OrderItem
+
+sales_table = MenuItemSales.__table__
+
+
+def add_to_sales_counters(session: Session, menu_item_id: UUID, quantity: int):
+    """
+    Add `quantity` (negative for removed order items) to the quantity sold
+    of a menu item in menu_item_sales. Must run in the same transaction as
+    the order item change.
+    """
+    statement = insert(sales_table).values(menu_item_id=menu_item_id, quantity_sold=quantity)
+    statement = statement.on_conflict_do_update(
+        index_elements=[sales_table.c.menu_item_id],
+        set_={"quantity_sold": sales_table.c.quantity_sold + statement.excluded.quantity_sold}
+    )
+    session.execute(statement)
+
+
+def delete_order_items(session: Session, reservation_id: UUID):
+    """Delete the order items of a reservation and take them off menu_item_sales"""
+    sold = session.exec(
+        select(OrderItem.menu_item_id, func.sum(OrderItem.quantity))
+        .where(OrderItem.reservation_id == reservation_id)
+        .group_by(OrderItem.menu_item_id)
+    ).all()
+    for menu_item_id, quantity in sold:
+        add_to_sales_counters(session, menu_item_id, -quantity)
+    if sold:
+        session.execute(delete(OrderItem).where(OrderItem.reservation_id == reservation_id))
@@ -1,18 +1,47 @@
+import os
+from datetime import date
 from uuid import UUID
-from sqlmodel import Session, select
+from sqlmodel import Session, select, func
 from fastapi import HTTPException, status
-from db.models import Category, MenuItem, OrderItem, Reservation
-from schemas.menu import CategoryCreate, MenuItemCreate, OrderItemCreate
+from db.invalidation import publish, subscribe
+from db.models import Category, MenuItem, MenuItemSales, OrderItem, Reservation
+from .sales import add_to_sales_counters
+from utils.stats import bucket_column, bucket_starts
+from schemas.menu import CategoryCreate, CategoryRead, MenuItemCreate, MenuItemRead, Menu, OrderItemCreate
+
+# Read /menu/stats from the menu_item_sales counters instead of grouping
+# every order item; the counters are maintained either way
+SALES_COUNTERS_STATS = os.getenv("MENU_SALES_COUNTERS", "true").lower() == "true"
+
+# Serialized menu of this worker, evicted through the invalidation bus
+_menu_cache = {}
+
+
+def _evict_menu(keys):
+    _menu_cache.clear()
+
+
+subscribe("menu", _evict_menu)
 
 
 def get_menu(session: Session):
     """
     Get the complete menu with categories and items
     """
+    cached = _menu_cache.get("menu")
+    if cached is not None:
+        return cached
+    
     categories = session.exec(select(Category)).all()
     items = session.exec(select(MenuItem)).all()
     
-    return {"categories": categories, "items": items}
+    menu = Menu(
+        categories=[CategoryRead.from_orm(category) for category in categories],
+        items=[MenuItemRead.from_orm(item) for item in items]
+    )
+    _menu_cache["menu"] = menu
+    
+    return menu
 
 
 def create_category(category_data: CategoryCreate, session: Session):
@@ -22,6 +51,7 @@ def create_category(category_data: CategoryCreate, session: Session):
     new_category = Category(name=category_data.name)
     
     session.add(new_category)
+    publish(session, "menu")
     session.commit()
     session.refresh(new_category)
     
@@ -43,6 +73,7 @@ def update_category(category_id: UUID, category_data: CategoryCreate, session: S
     category.name = category_data.name
     
     session.add(category)
+    publish(session, "menu")
     session.commit()
     session.refresh(category)
     
@@ -71,6 +102,7 @@ def delete_category(category_id: UUID, session: Session):
         )
     
     session.delete(category)
+    publish(session, "menu")
     session.commit()
     
     return {"message": "Category deleted successfully"}
@@ -98,6 +130,7 @@ def create_menu_item(item_data: MenuItemCreate, session: Session):
     )
     
     session.add(new_item)
+    publish(session, "menu")
     session.commit()
     session.refresh(new_item)
     
@@ -132,6 +165,7 @@ def update_menu_item(item_id: UUID, item_data: MenuItemCreate, session: Session)
     item.image_url = item_data.image_url
     
     session.add(item)
+    publish(session, "menu")
     session.commit()
     session.refresh(item)
     
@@ -160,6 +194,7 @@ def delete_menu_item(item_id: UUID, session: Session):
         )
     
     session.delete(item)
+    publish(session, "menu")
     session.commit()
     
     return {"message": "Menu item deleted successfully"}
@@ -195,6 +230,7 @@ def add_order_item(reservation_id: UUID, order_item_data: OrderItemCreate, sessi
     )
     
     session.add(new_order_item)
+    add_to_sales_counters(session, new_order_item.menu_item_id, new_order_item.quantity)
     session.commit()
     session.refresh(new_order_item)
     
@@ -205,48 +241,114 @@ def get_order_statistics(session: Session):
     """
     Get statistics for menu orders
     """
-    # Get all order items
-    order_items = session.exec(select(OrderItem)).all()
-    
-    # Calculate total orders (unique reservations with orders)
-    unique_reservations = set(item.reservation_id for item in order_items)
-    total_orders = len(unique_reservations)
-    
-    # Get menu items and categories for reference
-    menu_items = session.exec(select(MenuItem)).all()
-    item_map = {item.id: item for item in menu_items}
-    
-    # Get categories
-    categories = session.exec(select(Category)).all()
-    category_map = {cat.id: cat.name for cat in categories}
-    
-    # Count items sold
+    # Unique reservations with orders, read from the reservation_id index
+    total_orders = session.exec(
+        select(func.count(func.distinct(OrderItem.reservation_id)))
+    ).one()
+    
+    if SALES_COUNTERS_STATS:
+        # One counters row per menu item
+        item_totals = session.exec(
+            select(MenuItem.name, Category.name, MenuItemSales.quantity_sold, MenuItem.price)
+            .join(MenuItem, MenuItem.id == MenuItemSales.menu_item_id)
+            .outerjoin(Category, Category.id == MenuItem.category_id)
+            .where(MenuItemSales.quantity_sold != 0)
+        ).all()
+    else:
+        item_totals = session.exec(
+            select(MenuItem.name, Category.name, func.sum(OrderItem.quantity), MenuItem.price)
+            .join(MenuItem, MenuItem.id == OrderItem.menu_item_id)
+            .outerjoin(Category, Category.id == MenuItem.category_id)
+            .group_by(MenuItem.id, Category.id)
+        ).all()
+    
+    # Count items sold by item name and by category
     items_sold = {}
     items_by_category = {}
     total_revenue = 0
     
-    for order_item in order_items:
-        menu_item = item_map.get(order_item.menu_item_id)
-        if not menu_item:
-            continue
-            
-        # Count by item name
-        if menu_item.name not in items_sold:
-            items_sold[menu_item.name] = 0
-        items_sold[menu_item.name] += order_item.quantity
+    for item_name, category_name, quantity, price in item_totals:
+        items_sold[item_name] = items_sold.get(item_name, 0) + quantity
         
-        # Count by category
-        category_name = category_map.get(menu_item.category_id, "Без категории")
-        if category_name not in items_by_category:
-            items_by_category[category_name] = 0
-        items_by_category[category_name] += order_item.quantity
+        category_name = category_name or "Без категории"
+        items_by_category[category_name] = items_by_category.get(category_name, 0) + quantity
         
         # Calculate revenue
-        total_revenue += menu_item.price * order_item.quantity
+        total_revenue += price * quantity
     
     return {
         "total_orders": total_orders,
         "items_sold": items_sold,
         "items_by_category": items_by_category,
         "total_revenue": total_revenue
-    } 
\ No newline at end of file
+    }
+
+
+def _sales_series(series_id, name, totals, starts):
+    """Zero-filled buckets of one item, category or the grand total"""
+    buckets = [
+        {"bucket_start": start, "quantity": totals.get(start, (0, 0))[0], "revenue": totals.get(start, (0, 0))[1]}
+        for start in starts
+    ]
+    return {
+        "id": series_id,
+        "name": name,
+        "quantity": sum(bucket["quantity"] for bucket in buckets),
+        "revenue": sum(bucket["revenue"] for bucket in buckets),
+        "buckets": buckets
+    }
+
+
+def get_order_series(start_date: date, end_date: date, bucket: str, session: Session):
+    """
+    Get items sold and revenue per menu item and per category for a date
+    range, grouped by the reservation date into day/week/month buckets.
+    Orders of cancelled reservations are not counted.
+    """
+    bucket_date = bucket_column(bucket, Reservation.reservation_date).label("bucket_start")
+    rows = session.exec(
+        select(
+            bucket_date, MenuItem.id, MenuItem.name, Category.id, Category.name,
+            func.sum(OrderItem.quantity), func.sum(OrderItem.quantity * MenuItem.price)
+        )
+        .join(Reservation, Reservation.id == OrderItem.reservation_id)
+        .join(MenuItem, MenuItem.id == OrderItem.menu_item_id)
+        .outerjoin(Category, Category.id == MenuItem.category_id)
+        .where(
+            Reservation.reservation_date >= start_date,
+            Reservation.reservation_date <= end_date,
+            Reservation.status != "cancelled"
+        )
+        .group_by(bucket_date, MenuItem.id, Category.id)
+    ).all()
+    
+    # Roll the per item rows up to categories and the grand total
+    item_totals, category_totals, totals = {}, {}, {}
+    item_names, category_names = {}, {}
+    for start, item_id, item_name, category_id, category_name, quantity, revenue in rows:
+        item_names[item_id] = item_name
+        category_names[category_id] = category_name or "Без категории"
+        for key, target in ((item_id, item_totals), (category_id, category_totals)):
+            quantity_sum, revenue_sum = target.setdefault(key, {}).get(start, (0, 0))
+            target[key][start] = (quantity_sum + quantity, revenue_sum + revenue)
+        quantity_sum, revenue_sum = totals.get(start, (0, 0))
+        totals[start] = (quantity_sum + quantity, revenue_sum + revenue)
+    
+    starts = bucket_starts(start_date, end_date, bucket)
+    items = [
+        _sales_series(item_id, item_names[item_id], item_totals[item_id], starts)
+        for item_id in item_totals
+    ]
+    categories = [
+        _sales_series(category_id, category_names[category_id], category_totals[category_id], starts)
+        for category_id in category_totals
+    ]
+    
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "bucket": bucket,
+        "totals": _sales_series(None, "", totals, starts)["buckets"],
+        "items": sorted(items, key=lambda series: series["revenue"], reverse=True),
+        "categories": sorted(categories, key=lambda series: series["revenue"], reverse=True)
+    }
@@ -0,0 +1,87 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Iterable, List, Optional
+
+from db.invalidation import subscribe
+
+# Maximum number of cached availability answers per worker
+AVAILABILITY_CACHE_SIZE = int(os.getenv("AVAILABILITY_CACHE_SIZE", "512"))
+
+
+class AvailabilityCache:
+    """
+    Bounded LRU cache for get_available_tables results.
+
+    Keys start with the queried date so that a reservation mutation can
+    invalidate exactly the dates it touches.
+    """
+
+    def __init__(self, max_size: int = AVAILABILITY_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by every invalidation; put() refuses answers computed before one
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, generation: int):
+        with self._lock:
+            if generation != self.generation:
+                # Reservations changed while this answer was computed, it may be stale
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_dates(self, dates: Iterable[date]):
+        """Drop every cached answer for the given dates"""
+        dates = set(dates)
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._entries if key[0] in dates]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+availability_cache = AvailabilityCache()
+
+
+def _evict(keys: Optional[List[str]]):
+    if keys is None:
+        availability_cache.clear()
+    else:
+        availability_cache.invalidate_dates(date.fromisoformat(key) for key in keys)
+
+
+subscribe("availability", _evict)
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+from datetime import date
+from sqlmodel import Session, select
+from db.database import engine
+from db.models import Reservation, Table, TableType
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Rows fetched from the server-side cursor (and sent) per chunk
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    ("id", Reservation.id),
+    ("reservation_date", Reservation.reservation_date),
+    ("reservation_time", Reservation.reservation_time),
+    ("duration", Reservation.duration),
+    ("guests_count", Reservation.guests_count),
+    ("status", Reservation.status),
+    ("first_name", Reservation.first_name),
+    ("last_name", Reservation.last_name),
+    ("phone", Reservation.phone),
+    ("user_id", Reservation.user_id),
+    ("table_id", Reservation.table_id),
+    ("table_number", Table.table_number),
+    ("table_type", TableType.name),
+    ("table_type_display_name", TableType.display_name),
+]
+EXPORT_HEADER = [name for name, _ in EXPORT_COLUMNS]
+
+
+def _csv_chunk(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_HEADER, row)), ensure_ascii=False, default=str) + "\n"
+        for row in rows
+    )
+
+
+def export_reservations(start_date: date, end_date: date, export_format: str):
+    """
+    Generate the reservations of a date range, with table and type info, as
+    CSV or NDJSON text chunks.
+
+    Rows are read through a server-side cursor EXPORT_BATCH_SIZE at a time,
+    so memory use does not depend on the size of the range. The generator
+    opens its own session because it runs after the request handler returns.
+    """
+    if export_format == "csv":
+        # The BOM makes Excel read the Cyrillic names as UTF-8
+        yield "\ufeff" + _csv_chunk([EXPORT_HEADER])
+        write_chunk = _csv_chunk
+    else:
+        write_chunk = _ndjson_chunk
+
+    statement = (
+        select(*[column for _, column in EXPORT_COLUMNS])
+        .outerjoin(Table, Table.id == Reservation.table_id)
+        .outerjoin(TableType, TableType.id == Table.type_id)
+        .where(
+            Reservation.reservation_date >= start_date,
+            Reservation.reservation_date <= end_date
+        )
+        .order_by(Reservation.reservation_date, Reservation.reservation_time, Table.table_number)
+        .execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    with Session(engine) as session:
+        for rows in session.exec(statement).partitions():
+            yield write_chunk(rows)
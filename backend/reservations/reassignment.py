@@ -0,0 +1,179 @@
+from collections import defaultdict
+from datetime import datetime
+from uuid import UUID
+from sqlmodel import Session, select, and_, or_
+from db.models import Reservation, Table
+from .rollup import add_to_daily_stats, remove_from_daily_stats
+from .services import BANQUET_HALL_TYPE_ID, FULL_DAY_MASK, hours_mask, lock_table_dates
+
+
+def _fits(table: Table, guests_count: int) -> bool:
+    """The same capacity rules as a new booking of the table"""
+    return table.max_guests // 2 <= guests_count <= table.max_guests
+
+
+def _booked_mask(table: Table, reservation_time, duration: int) -> int:
+    if table.type_id == BANQUET_HALL_TYPE_ID:
+        return FULL_DAY_MASK
+    return hours_mask(reservation_time.hour, duration)
+
+
+def _is_free(table: Table, occupied: int, reservation: Reservation) -> bool:
+    if table.type_id == BANQUET_HALL_TYPE_ID:
+        # A banquet hall takes one booking per day
+        return not occupied
+    return not occupied & hours_mask(reservation.reservation_time.hour, reservation.duration)
+
+
+# Search steps spent per day on improving the greedy assignment, and the
+# number of a day's reservations above which the greedy one is kept as is
+ASSIGNMENT_SEARCH_BUDGET = 20000
+ASSIGNMENT_SEARCH_MAX = 300
+
+
+def _assign_day(reservations, tables, occupancy):
+    """
+    Place one day's reservations on the tables, given the occupancy bitmask
+    of each table id, placing as many as possible. Returns {reservation id:
+    table} for the placed ones.
+
+    Greedy interval scheduling first: the reservations with the fewest
+    suitable tables go first (earliest first among equals), each on the
+    smallest free table that fits. If some are left over, a branch and bound
+    search over the same order looks for an assignment that places more,
+    within ASSIGNMENT_SEARCH_BUDGET steps.
+    """
+    candidates = {
+        reservation.id: [table for table in tables if _fits(table, reservation.guests_count)]
+        for reservation in reservations
+    }
+    order = sorted(
+        reservations,
+        key=lambda r: (len(candidates[r.id]), r.reservation_time, -r.duration)
+    )
+    masks = {
+        (reservation.id, table.id): _booked_mask(table, reservation.reservation_time, reservation.duration)
+        for reservation in order for table in candidates[reservation.id]
+    }
+
+    def free_tables(reservation, occupied):
+        return [
+            table for table in candidates[reservation.id]
+            if _is_free(table, occupied.get(table.id, 0), reservation)
+        ]
+
+    best = {}
+    occupied = dict(occupancy)
+    for reservation in order:
+        free = free_tables(reservation, occupied)
+        if free:
+            best[reservation.id] = free[0]
+            occupied[free[0].id] = occupied.get(free[0].id, 0) | masks[(reservation.id, free[0].id)]
+
+    budget = ASSIGNMENT_SEARCH_BUDGET
+    current = {}
+
+    def search(position, occupied):
+        nonlocal best, budget
+        if len(best) == len(order) or budget <= 0:
+            return
+        if len(current) + len(order) - position <= len(best):
+            # Even placing every remaining one would not beat the best
+            return
+        if position == len(order):
+            best = dict(current)
+            return
+        budget -= 1
+        reservation = order[position]
+        for table in free_tables(reservation, occupied):
+            current[reservation.id] = table
+            search(position + 1, {
+                **occupied, table.id: occupied.get(table.id, 0) | masks[(reservation.id, table.id)]
+            })
+            del current[reservation.id]
+        search(position + 1, occupied)
+
+    if len(order) <= ASSIGNMENT_SEARCH_MAX:
+        search(0, dict(occupancy))
+    for reservation_id, table in best.items():
+        occupancy[table.id] = occupancy.get(table.id, 0) | masks[(reservation_id, table.id)]
+    return best
+
+
+def reassign_reservations(session: Session, table_ids, room_id: UUID) -> dict:
+    """
+    Move the upcoming reservations of tables about to be deactivated to the
+    other active tables of the room, without double booking any of them.
+
+    The affected reservations and the occupancy of the remaining tables are
+    loaded with one query each, and the (table, date) booking locks of the
+    dates involved are held until commit. Reservations that fit nowhere stay
+    on their table and are reported as unplaceable, for staff to resolve.
+    Past, ongoing and cancelled reservations are left alone.
+    Returns {"moved": [...], "unplaceable": [...]}.
+    """
+    now = datetime.now()
+    reservations = session.exec(
+        select(Reservation)
+        .where(
+            Reservation.table_id.in_(table_ids),
+            Reservation.status != "cancelled",
+            or_(
+                Reservation.reservation_date > now.date(),
+                and_(Reservation.reservation_date == now.date(), Reservation.reservation_time > now.time())
+            )
+        )
+        .order_by(Reservation.reservation_date, Reservation.reservation_time)
+    ).all()
+    if not reservations:
+        return {"moved": [], "unplaceable": []}
+
+    tables = session.exec(
+        select(Table)
+        .where(Table.room_id == room_id, Table.is_active == True, Table.id.notin_(table_ids))
+        .order_by(Table.max_guests, Table.table_number)
+        # Bulk updates of the layout save bypass the session's copies
+        .execution_options(populate_existing=True)
+    ).all()
+    tables_by_id = {table.id: table for table in tables}
+    dates = sorted({reservation.reservation_date for reservation in reservations})
+
+    occupancy = defaultdict(dict)
+    if tables:
+        lock_table_dates(session, [(table.id, day) for table in tables for day in dates])
+        rows = session.exec(
+            select(Reservation.table_id, Reservation.reservation_date, Reservation.reservation_time, Reservation.duration)
+            .where(Reservation.table_id.in_(tables_by_id), Reservation.reservation_date.in_(dates))
+        ).all()
+        for table_id, reservation_date, reservation_time, duration in rows:
+            day = occupancy[reservation_date]
+            day[table_id] = day.get(table_id, 0) | _booked_mask(tables_by_id[table_id], reservation_time, duration)
+
+    by_date = defaultdict(list)
+    for reservation in reservations:
+        by_date[reservation.reservation_date].append(reservation)
+
+    report = {"moved": [], "unplaceable": []}
+    for day in dates:
+        placed = _assign_day(by_date[day], tables, occupancy[day])
+        for reservation in by_date[day]:
+            entry = {
+                "id": reservation.id,
+                "reservation_date": reservation.reservation_date,
+                "reservation_time": reservation.reservation_time,
+                "guests_count": reservation.guests_count,
+                "from_table_id": reservation.table_id,
+                "to_table_id": None,
+            }
+            table = placed.get(reservation.id)
+            if table is None:
+                report["unplaceable"].append(entry)
+                continue
+
+            remove_from_daily_stats(session, reservation)
+            reservation.table_id = table.id
+            session.add(reservation)
+            add_to_daily_stats(session, reservation)
+            report["moved"].append({**entry, "to_table_id": table.id})
+
+    return report
@@ -0,0 +1,41 @@
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session
+from db.models import Reservation, ReservationDailyStats
+
+stats_table = ReservationDailyStats.__table__
+
+
+def _apply(session: Session, reservation: Reservation, sign: int):
+    cancelled = 1 if reservation.status == "cancelled" else 0
+    statement = insert(stats_table).values(
+        stat_date=reservation.reservation_date,
+        table_id=reservation.table_id,
+        reservation_count=sign,
+        cancelled_count=sign * cancelled,
+        guests_sum=sign * reservation.guests_count,
+        duration_sum=sign * reservation.duration
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[stats_table.c.stat_date, stats_table.c.table_id],
+        set_={
+            column: stats_table.c[column] + statement.excluded[column]
+            for column in ("reservation_count", "cancelled_count", "guests_sum", "duration_sum")
+        }
+    )
+    session.execute(statement)
+
+
+def add_to_daily_stats(session: Session, reservation: Reservation):
+    """
+    Count a new (or just changed) reservation in reservation_daily_stats.
+    Must run in the same transaction as the reservation write.
+    """
+    _apply(session, reservation, 1)
+
+
+def remove_from_daily_stats(session: Session, reservation: Reservation):
+    """
+    Remove a reservation's contribution from reservation_daily_stats, before
+    it is deleted or before its date, table, guests, duration or status change
+    """
+    _apply(session, reservation, -1)
@@ -2,20 +2,30 @@ from datetime import date, time, datetime, timedelta
 from typing import List, Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, func, select
 from db.database import get_session
+from db.invalidation import publish
 from utils.security import get_current_user, get_current_admin
+from utils.stats import parse_stats_dates, parse_stats_range
 from db.models import User, Reservation, Table, OrderItem, TableType
+from menu.sales import delete_order_items
 from schemas.reservation import (
     ReservationCreate, ReservationRead, ReservationEnhanced,
-    TableAvailability, AvailabilityQuery, ReservationStats,
+    TableAvailability, AvailabilityQuery, AvailabilityRange, ReservationStats,
+    ReservationStatsSeries, UtilizationReport,
     ReservationStatusUpdate
 )
 from .services import (
-    get_available_tables, create_reservation, get_reservations_by_date, 
-    get_reservation_statistics, get_user_reservations,
-    get_reservation_by_id, update_reservation, update_reservation_status
+    get_available_tables, get_availability_range, create_reservation, get_reservations_by_date, 
+    get_reservation_statistics, get_reservation_series, get_user_reservations,
+    get_reservation_by_id, update_reservation, update_reservation_status,
+    serialize_reservation
 )
+from .cache import availability_cache
+from .rollup import remove_from_daily_stats
+from .utilization import get_table_utilization
+from .export import EXPORT_FORMATS, export_reservations
 
 router = APIRouter()
 
@@ -35,6 +45,7 @@ def check_tables_availability(
     date: str = Query(..., description="Date to check availability for (YYYY-MM-DD)"),
     time: Optional[str] = Query(None, description="Optional time to filter availability (HH:MM)"),
     duration: int = Query(1, description="Duration of the reservation in hours (1-6)", ge=1, le=6),
+    room_id: Optional[UUID] = Query(None, description="Only the tables of this room"),
     session: Session = Depends(get_session)
 ):
     """Check table availability for a specific date, time and duration"""
@@ -47,7 +58,7 @@ def check_tables_availability(
         if time:
             parsed_time = datetime.strptime(time, "%H:%M").time()
             
-        return get_available_tables(parsed_date, parsed_time, duration, session)
+        return get_available_tables(parsed_date, parsed_time, duration, session, room_id)
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -55,6 +66,37 @@ def check_tables_availability(
         )
 
 
+@router.get("/availability/range", response_model=AvailabilityRange)
+def check_tables_availability_range(
+    start_date: str = Query(..., description="First date of the range (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="Last date of the range (YYYY-MM-DD), defaults to the end of the booking window"),
+    duration: int = Query(1, description="Duration of the reservation in hours (1-6)", ge=1, le=6),
+    room_id: Optional[UUID] = Query(None, description="Only the tables of this room"),
+    session: Session = Depends(get_session)
+):
+    """Check availability of all tables for every day and time slot in a date range"""
+    try:
+        parsed_start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        parsed_end = None
+        if end_date:
+            parsed_end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Неверный формат даты. Используйте ГГГГ-ММ-ДД для даты."
+        )
+    
+    return get_availability_range(parsed_start, parsed_end, duration, session, room_id)
+
+
+@router.get("/availability/cache")
+def get_availability_cache_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Get hit/miss counters of this worker's availability cache (admin only)"""
+    return availability_cache.stats()
+
+
 @router.get("/", response_model=List[ReservationEnhanced])
 def get_reservations(
     date: str = Query(..., description="Date to get reservations for (YYYY-MM-DD)"),
@@ -67,51 +109,7 @@ def get_reservations(
         parsed_date = datetime.strptime(date, "%Y-%m-%d").date()
         reservations = get_reservations_by_date(parsed_date, session)
         
-        # Prepare enhanced response with table info
-        enhanced_reservations = []
-        for reservation in reservations:
-            # Get the table information
-            table = session.get(Table, reservation.table_id)
-            if table:
-                # Create a copy of the reservation to avoid modifying the ORM object
-                reservation_dict = {
-                    "id": str(reservation.id),
-                    "user_id": str(reservation.user_id),
-                    "table_id": str(reservation.table_id),
-                    "reservation_date": reservation.reservation_date,
-                    "reservation_time": reservation.reservation_time,
-                    "duration": reservation.duration,
-                    "guests_count": reservation.guests_count,
-                    "first_name": reservation.first_name,
-                    "last_name": reservation.last_name,
-                    "phone": reservation.phone,
-                    "status": reservation.status,
-                    "table": {
-                        "id": str(table.id),
-                        "type_id": table.type_id,
-                        "table_number": table.table_number,
-                        "width": table.width,
-                        "height": table.height
-                    }
-                }
-                
-                # Add table type info if available
-                if table.type_id:
-                    table_type = session.get(TableType, table.type_id)
-                    if table_type:
-                        reservation_dict["table"]["table_type"] = {
-                            "id": table_type.id,
-                            "name": table_type.name,
-                            "display_name": table_type.display_name,
-                            "default_width": table_type.default_width,
-                            "default_height": table_type.default_height,
-                            "default_max_guests": table_type.default_max_guests,
-                            "color_code": table_type.color_code
-                        }
-                
-                enhanced_reservations.append(reservation_dict)
-        
-        return enhanced_reservations
+        return [serialize_reservation(reservation) for reservation in reservations if reservation.table]
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -131,13 +129,7 @@ def get_enhanced_reservations(
         parsed_date = datetime.strptime(query_date, "%Y-%m-%d").date()
         reservations = get_reservations_by_date(parsed_date, session)
         
-        # Load related table info for each reservation
-        for reservation in reservations:
-            table = session.get(Table, reservation.table_id)
-            if table:
-                reservation.table = table
-        
-        return reservations
+        return [serialize_reservation(reservation) for reservation in reservations if reservation.table]
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -164,6 +156,54 @@ def get_stats(
     return get_reservation_statistics(period, session)
 
 
+@router.get("/stats/series", response_model=ReservationStatsSeries)
+def get_stats_series(
+    start: Optional[str] = Query(None, alias="from", description="First date of the range (YYYY-MM-DD), defaults to 30 days before `to`"),
+    end: Optional[str] = Query(None, alias="to", description="Last date of the range (YYYY-MM-DD), defaults to today"),
+    bucket: str = Query("day", description="Bucket size (day, week, month)"),
+    current_user: User = Depends(get_current_admin),
+    session: Session = Depends(get_session)
+):
+    """Get reservation statistics for a date range grouped into time buckets (admin only)"""
+    start_date, end_date, bucket = parse_stats_range(start, end, bucket)
+    return get_reservation_series(start_date, end_date, bucket, session)
+
+
+@router.get("/stats/utilization", response_model=UtilizationReport)
+def get_utilization(
+    start: Optional[str] = Query(None, alias="from", description="First date of the range (YYYY-MM-DD), defaults to 30 days before `to`"),
+    end: Optional[str] = Query(None, alias="to", description="Last date of the range (YYYY-MM-DD), defaults to today"),
+    current_user: User = Depends(get_current_admin),
+    session: Session = Depends(get_session)
+):
+    """Get the table x hour utilization heatmap for a date range (admin only)"""
+    start_date, end_date = parse_stats_dates(start, end)
+    return get_table_utilization(start_date, end_date, session)
+
+
+@router.get("/export")
+def export_reservations_range(
+    start: str = Query(..., alias="from", description="First date of the range (YYYY-MM-DD)"),
+    end: str = Query(..., alias="to", description="Last date of the range (YYYY-MM-DD)"),
+    format: str = Query("csv", description="Export format (csv, ndjson)"),
+    current_user: User = Depends(get_current_admin)
+):
+    """Stream all reservations of a date range with table info as CSV or NDJSON (admin only)"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Неверный формат экспорта. Используйте csv или ndjson."
+        )
+    start_date, end_date = parse_stats_dates(start, end)
+    
+    filename = f"reservations_{start_date}_{end_date}.{format}"
+    return StreamingResponse(
+        export_reservations(start_date, end_date, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/{reservation_id}", response_model=ReservationEnhanced)
 def get_reservation_details(
     reservation_id: UUID,
@@ -207,14 +247,7 @@ def update_reservation_details(
         )
     
     # Update the reservation
-    updated = update_reservation(reservation_id, updated_data, session)
-    
-    # Load the table for enhanced details
-    table = session.get(Table, updated["table_id"])
-    if table:
-        updated["table"] = table
-    
-    return updated
+    return update_reservation(reservation_id, updated_data, session)
 
 
 @router.delete("/{reservation_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -239,8 +272,11 @@ def delete_reservation(
             detail="Вы не можете отменить это бронирование"
         )
     
-    # Delete the reservation
+    # Delete the reservation with its order
+    remove_from_daily_stats(session, reservation)
+    delete_order_items(session, reservation_id)
     session.delete(reservation)
+    publish(session, "availability", [reservation.reservation_date])
     session.commit()
     
     return None
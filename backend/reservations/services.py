@@ -1,10 +1,17 @@
 from datetime import date, time, datetime, timedelta
 from typing import List
 from uuid import UUID
+from sqlalchemy import text, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from sqlmodel import Session, select, and_, or_
 from fastapi import HTTPException, status
-from db.models import Reservation, Table, TableType
+from db.models import Reservation, ReservationDailyStats, Table, TableType, reservation_time_span
 from schemas.reservation import ReservationCreate, TableAvailability
+from db.invalidation import publish
+from .cache import availability_cache
+from .rollup import add_to_daily_stats, remove_from_daily_stats
+from utils.stats import bucket_column, bucket_starts
 
 # Reservation time slots from 12:00 to 23:00
 OPENING_HOUR = 12
@@ -17,8 +24,244 @@ MAX_DAYS_ADVANCE = 14
 # Banquet hall table type ID
 BANQUET_HALL_TYPE_ID = 5
 
+# Occupancy bitmasks: bit N is set when hour N of the day is booked
+FULL_DAY_MASK = (1 << 24) - 1
 
-def get_available_tables(query_date: date, query_time: time = None, duration: int = 1, session: Session = None):
+
+# Load a reservation's table and table type in the same query
+RESERVATION_TABLE_INFO = joinedload(Reservation.table).joinedload(Table.table_type)
+
+
+def serialize_reservation(reservation: Reservation):
+    """
+    Convert a reservation into a ReservationEnhanced dict with its table and
+    table type. Load them with RESERVATION_TABLE_INFO to avoid per-row queries.
+    """
+    reservation_dict = {
+        "id": str(reservation.id),
+        "user_id": str(reservation.user_id),
+        "table_id": str(reservation.table_id),
+        "reservation_date": reservation.reservation_date,
+        "reservation_time": reservation.reservation_time,
+        "duration": reservation.duration,
+        "guests_count": reservation.guests_count,
+        "first_name": reservation.first_name,
+        "last_name": reservation.last_name,
+        "phone": reservation.phone,
+        "status": reservation.status
+    }
+    
+    table = reservation.table
+    if table:
+        table_dict = {
+            "id": str(table.id),
+            "type_id": table.type_id,
+            "table_number": table.table_number,
+            "width": table.width,
+            "height": table.height
+        }
+        
+        table_type = table.table_type
+        if table_type:
+            table_dict["table_type"] = {
+                "id": table_type.id,
+                "name": table_type.name,
+                "display_name": table_type.display_name,
+                "default_width": table_type.default_width,
+                "default_height": table_type.default_height,
+                "default_max_guests": table_type.default_max_guests,
+                "color_code": table_type.color_code
+            }
+        
+        reservation_dict["table"] = table_dict
+    
+    return reservation_dict
+
+
+def hours_mask(start_hour: int, duration: int) -> int:
+    """
+    Bitmask of the hours [start_hour, start_hour + duration), clipped to the day
+    """
+    end_hour = min(start_hour + duration, 24)
+    if end_hour <= start_hour:
+        return 0
+    return ((1 << (end_hour - start_hour)) - 1) << start_hour
+
+
+def free_start_mask(occupied: int, duration: int) -> int:
+    """
+    Bitmask of the time slots where a booking of `duration` hours fits
+    without overlapping `occupied` and without running past closing time
+    """
+    free = ~occupied & FULL_DAY_MASK
+    starts = free
+    for offset in range(1, duration):
+        starts &= free >> offset
+    
+    last_start_hour = CLOSING_HOUR + 1 - duration
+    if last_start_hour < OPENING_HOUR:
+        return 0
+    return starts & hours_mask(OPENING_HOUR, last_start_hour - OPENING_HOUR + 1)
+
+
+def time_span(reservation_date: date, reservation_time: time, duration: int):
+    """
+    SQL tsrange covering a booking, comparable with reservations.time_span
+    """
+    start = datetime.combine(reservation_date, reservation_time)
+    return func.tsrange(start, start + timedelta(hours=duration))
+
+
+def find_overlapping_reservation(session: Session, table_id: UUID, reservation_date: date,
+                                 reservation_time: time, duration: int, exclude_id: UUID = None):
+    """
+    Find a reservation of the table whose time range overlaps the requested one
+    """
+    conditions = [
+        Reservation.table_id == table_id,
+        reservation_time_span.op("&&")(time_span(reservation_date, reservation_time, duration))
+    ]
+    if exclude_id is not None:
+        conditions.append(Reservation.id != exclude_id)
+    
+    return session.exec(select(Reservation).where(and_(*conditions)).limit(1)).first()
+
+
+def load_occupancy(session: Session, start_date: date, end_date: date, query_time: time = None, duration: int = 1,
+                   room_id: UUID = None):
+    """
+    Build the occupancy index for a date range with a single query.
+    
+    Returns the active tables (of one room if `room_id` is given) and a dict
+    mapping (table_id, date) to a bitmask of booked hours. Any reservation on
+    a banquet hall books the whole day. When `query_time` is given only
+    reservations overlapping the requested range are loaded.
+    """
+    join_conditions = [
+        Reservation.table_id == Table.id,
+        Reservation.reservation_date >= start_date,
+        Reservation.reservation_date <= end_date
+    ]
+    if query_time:
+        join_conditions.append(or_(
+            Table.type_id == BANQUET_HALL_TYPE_ID,
+            reservation_time_span.op("&&")(time_span(start_date, query_time, duration))
+        ))
+    
+    table_conditions = [Table.is_active == True]
+    if room_id is not None:
+        table_conditions.append(Table.room_id == room_id)
+    
+    rows = session.exec(
+        select(Table, Reservation.reservation_date, Reservation.reservation_time, Reservation.duration)
+        .outerjoin(Reservation, and_(*join_conditions))
+        .where(*table_conditions)
+    ).all()
+    
+    tables = {}
+    occupancy = {}
+    for table, reservation_date, reservation_time, reservation_duration in rows:
+        tables.setdefault(table.id, table)
+        if reservation_date is None:
+            continue
+        
+        if table.type_id == BANQUET_HALL_TYPE_ID:
+            booked = FULL_DAY_MASK
+        else:
+            booked = hours_mask(reservation_time.hour, reservation_duration)
+        
+        key = (table.id, reservation_date)
+        occupancy[key] = occupancy.get(key, 0) | booked
+    
+    return list(tables.values()), occupancy
+
+
+def table_availability(table: Table, occupied: int, query_time: time = None, duration: int = 1, today_hour: int = None):
+    """
+    Answer an availability query for one table from its occupancy bitmask.
+    
+    `today_hour` is the current hour when the query is for today, so that
+    slots up to and including it are not offered.
+    """
+    if query_time:
+        # A specific time: the requested hours must all be free
+        requested = hours_mask(query_time.hour, min(duration, CLOSING_HOUR + 1 - query_time.hour))
+        available = not occupied & requested
+        return TableAvailability(
+            table_id=table.id,
+            type_id=table.type_id,
+            table_number=table.table_number,
+            available=available,
+            available_times=[query_time] if available else None
+        )
+    
+    # All time slots that can fit the requested duration
+    starts = free_start_mask(occupied, duration)
+    if today_hour is not None:
+        starts &= ~hours_mask(0, today_hour + 1)
+    
+    available_times = [slot for slot in TIME_SLOTS if starts >> slot.hour & 1]
+    
+    return TableAvailability(
+        table_id=table.id,
+        type_id=table.type_id,
+        table_number=table.table_number,
+        available=len(available_times) > 0,
+        available_times=available_times
+    )
+
+
+def lock_table_date(session: Session, table_id: UUID, reservation_date: date):
+    """
+    Serialize bookings of one table on one date until the transaction ends.
+    
+    Takes a transaction-scoped advisory lock, so the overlap check and the
+    insert that follows cannot interleave with another worker booking the
+    same table and date. Other tables and dates are not blocked.
+    """
+    lock_table_dates(session, [(table_id, reservation_date)])
+
+
+def lock_table_dates(session: Session, pairs):
+    """
+    lock_table_date() for many (table_id, date) pairs with one statement.
+    The locks are taken in a fixed order, so two callers cannot deadlock.
+    """
+    if session.get_bind().dialect.name != "postgresql" or not pairs:
+        return
+    
+    # Both keys must fit into a signed 32-bit integer
+    keys = sorted({
+        (table_id.int % (1 << 32) - (1 << 31), reservation_date.toordinal())
+        for table_id, reservation_date in pairs
+    })
+    session.execute(
+        text(
+            "SELECT pg_advisory_xact_lock(table_key, date_key) "
+            "FROM unnest(CAST(:table_keys AS integer[]), CAST(:date_keys AS integer[])) "
+            "WITH ORDINALITY AS keys(table_key, date_key, position) ORDER BY position"
+        ),
+        {"table_keys": [key[0] for key in keys], "date_keys": [key[1] for key in keys]}
+    )
+
+
+def commit_reservation(session: Session):
+    """
+    Commit a new or moved booking, turning a violation of the
+    reservations_no_overlap constraint into a regular conflict error
+    """
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Столик уже занят в это время или выбранная продолжительность конфликтует с существующим бронированием"
+        )
+
+
+def get_available_tables(query_date: date, query_time: time = None, duration: int = 1, session: Session = None,
+                         room_id: UUID = None):
     # Validate date is within allowed range
     today = date.today()
     max_date = today + timedelta(days=MAX_DAYS_ADVANCE)
@@ -48,172 +291,99 @@ def get_available_tables(query_date: date, query_time: time = None, duration: in
             detail="Максимальная продолжительность бронирования - 6 часов"
         )
     
-    # Get all active tables
-    tables = session.exec(select(Table).where(Table.is_active == True)).all()
+    today_hour = datetime.now().hour if query_date == today else None
+    
+    # Same-day answers depend on the current hour, so it is part of the key
+    cache_key = (query_date, query_time, duration, today_hour, room_id)
+    cached = availability_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
+    
+    generation = availability_cache.generation
+    # One round trip: every active table with its reservations for the day
+    tables, occupancy = load_occupancy(session, query_date, query_date, query_time, duration, room_id)
+    
+    availability = [
+        table_availability(
+            table,
+            occupancy.get((table.id, query_date), 0),
+            query_time,
+            duration,
+            today_hour
+        )
+        for table in tables
+    ]
     
-    # For each table, check availability
-    availability = []
+    availability_cache.put(cache_key, availability, generation)
     
-    for table in tables:
-        # Special handling for banquet hall tables
-        is_banquet_hall = table.type_id == BANQUET_HALL_TYPE_ID
-        
-        if query_time:
-            # Calculate end time based on duration
-            start_hour = query_time.hour
-            end_hour = min(start_hour + duration, CLOSING_HOUR + 1)  # +1 because end_hour is exclusive
-            
-            # Check if requested duration spans beyond closing time
-            if end_hour > CLOSING_HOUR + 1:
-                continue  # Skip this table as it can't accommodate the requested duration
-            
-            # For banquet halls, check if any reservation exists on that day
-            if is_banquet_hall:
-                existing_reservation = session.exec(
-                    select(Reservation).where(
-                        and_(
-                            Reservation.table_id == table.id,
-                            Reservation.reservation_date == query_date
-                        )
-                    )
-                ).first()
-            else:
-                # For regular tables: check if any reservations overlap with the requested time range
-                existing_reservations = session.exec(
-                    select(Reservation).where(
-                        and_(
-                            Reservation.table_id == table.id,
-                            Reservation.reservation_date == query_date
-                        )
-                    )
-                ).all()
-                
-                # Check for time slot conflicts
-                has_conflict = False
-                for existing in existing_reservations:
-                    existing_start_hour = existing.reservation_time.hour
-                    existing_end_hour = existing_start_hour + existing.duration
-                    
-                    # Check if there's an overlap between requested and existing time slots
-                    if (start_hour < existing_end_hour and end_hour > existing_start_hour):
-                        has_conflict = True
-                        break
-                
-                existing_reservation = None if not has_conflict else True
-            
-            # Create a list with just the requested time if it's available
-            available_times = None
-            if existing_reservation is None:  # If the time slot is available
-                available_times = [query_time]
-            
-            availability.append(
-                TableAvailability(
-                    table_id=table.id,
-                    type_id=table.type_id,
-                    table_number=table.table_number,
-                    available=existing_reservation is None,
-                    available_times=available_times
-                )
-            )
-        else:
-            # For all time slots
-            if is_banquet_hall:
-                # For banquet halls, if any reservation exists on that day,
-                # no time slots are available
-                existing_reservation = session.exec(
-                    select(Reservation).where(
-                        and_(
-                            Reservation.table_id == table.id,
-                            Reservation.reservation_date == query_date
-                        )
-                    )
-                ).first()
-                
-                if existing_reservation:
-                    # Banquet hall is already booked for this day
-                    availability.append(
-                        TableAvailability(
-                            table_id=table.id,
-                            type_id=table.type_id,
-                            table_number=table.table_number,
-                            available=False,
-                            available_times=[]
-                        )
-                    )
-                else:
-                    # Banquet hall is free for the whole day
-                    available_times = TIME_SLOTS
-                    
-                    # For same-day reservations, filter out time slots up to and including current hour
-                    if query_date == today:
-                        now = datetime.now()
-                        current_hour = now.hour
-                        available_times = [t for t in available_times if t.hour > current_hour]
-                    
-                    # Filter out time slots that can't accommodate the requested duration
-                    available_times = [t for t in available_times if t.hour + duration <= CLOSING_HOUR + 1]
-                    
-                    availability.append(
-                        TableAvailability(
-                            table_id=table.id,
-                            type_id=table.type_id,
-                            table_number=table.table_number,
-                            available=len(available_times) > 0,
-                            available_times=available_times
-                        )
-                    )
-            else:
-                # For regular tables, check each time slot with duration
-                existing_reservations = session.exec(
-                    select(Reservation).where(
-                        and_(
-                            Reservation.table_id == table.id,
-                            Reservation.reservation_date == query_date
-                        )
-                    )
-                ).all()
-                
-                # Calculate all available time slots considering duration
-                available_times = []
-                for potential_start in TIME_SLOTS:
-                    start_hour = potential_start.hour
-                    end_hour = start_hour + duration
-                    
-                    # Skip if this time slot extends beyond closing time
-                    if end_hour > CLOSING_HOUR + 1:
-                        continue
-                    
-                    # Check for conflicts with existing reservations
-                    has_conflict = False
-                    for existing in existing_reservations:
-                        existing_start_hour = existing.reservation_time.hour
-                        existing_end_hour = existing_start_hour + existing.duration
-                        
-                        # Check for overlap
-                        if (start_hour < existing_end_hour and end_hour > existing_start_hour):
-                            has_conflict = True
-                            break
-                    
-                    if not has_conflict:
-                        available_times.append(potential_start)
-                
-                # For same-day reservations, filter out time slots up to and including current hour
-                if query_date == today:
-                    now = datetime.now()
-                    current_hour = now.hour
-                    available_times = [t for t in available_times if t.hour > current_hour]
-                
-                availability.append(
-                    TableAvailability(
-                        table_id=table.id,
-                        type_id=table.type_id,
-                        table_number=table.table_number,
-                        available=len(available_times) > 0,
-                        available_times=available_times
-                    )
-                )
+    return list(availability)
+
+
+def get_availability_range(start_date: date, end_date: date = None, duration: int = 1, session: Session = None,
+                           room_id: UUID = None):
+    """
+    Get availability of every table for every day and slot in a date range
+    """
+    today = date.today()
+    max_date = today + timedelta(days=MAX_DAYS_ADVANCE)
+    
+    if end_date is None:
+        end_date = max_date
+    
+    if start_date < today:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Нельзя бронировать на прошедшую дату"
+        )
+    
+    if end_date > max_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Бронирование возможно только до {max_date}"
+        )
+    
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Дата окончания не может быть раньше даты начала"
+        )
+    
+    # Validate duration
+    if duration < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Минимальная продолжительность бронирования - 1 час"
+        )
     
-    return availability
+    if duration > 6:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Максимальная продолжительность бронирования - 6 часов"
+        )
+    
+    # One query over the whole range instead of one request per day
+    tables, occupancy = load_occupancy(session, start_date, end_date, room_id=room_id)
+    current_hour = datetime.now().hour
+    
+    days = []
+    day = start_date
+    while day <= end_date:
+        today_hour = current_hour if day == today else None
+        days.append({
+            "date": day,
+            "tables": [
+                table_availability(table, occupancy.get((table.id, day), 0), None, duration, today_hour)
+                for table in tables
+            ]
+        })
+        day += timedelta(days=1)
+    
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "duration": duration,
+        "days": days
+    }
 
 
 def create_reservation(reservation_data: ReservationCreate, user_id: UUID, session: Session):
@@ -295,6 +465,9 @@ def create_reservation(reservation_data: ReservationCreate, user_id: UUID, sessi
             detail=f"Минимальное количество гостей для этого столика - {min_required_guests}"
         )
     
+    # Hold the (table, date) lock until commit so the check below stays valid
+    lock_table_date(session, table.id, reservation_data.reservation_date)
+    
     # Check table availability based on table type
     is_banquet_hall = table.type_id == BANQUET_HALL_TYPE_ID
     
@@ -315,31 +488,20 @@ def create_reservation(reservation_data: ReservationCreate, user_id: UUID, sessi
                 detail="Банкетный зал уже забронирован на эту дату"
             )
     else:
-        # For regular tables, check for conflicts with existing reservations
-        existing_reservations = session.exec(
-            select(Reservation).where(
-                and_(
-                    Reservation.table_id == reservation_data.table_id,
-                    Reservation.reservation_date == reservation_data.reservation_date
-                )
-            )
-        ).all()
-        
-        # Calculate requested time slot
-        start_hour = reservation_data.reservation_time.hour
-        end_hour = start_hour + reservation_data.duration
+        # For regular tables, ask the database for an overlapping booking
+        existing_reservation = find_overlapping_reservation(
+            session,
+            reservation_data.table_id,
+            reservation_data.reservation_date,
+            reservation_data.reservation_time,
+            reservation_data.duration
+        )
         
-        # Check for conflicts with any existing reservation
-        for existing in existing_reservations:
-            existing_start_hour = existing.reservation_time.hour
-            existing_end_hour = existing_start_hour + existing.duration
-            
-            # Check for overlap between requested and existing time slots
-            if (start_hour < existing_end_hour and end_hour > existing_start_hour):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Столик уже занят в это время или выбранная продолжительность конфликтует с существующим бронированием"
-                )
+        if existing_reservation:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Столик уже занят в это время или выбранная продолжительность конфликтует с существующим бронированием"
+            )
     
     # Create reservation
     new_reservation = Reservation(
@@ -355,7 +517,9 @@ def create_reservation(reservation_data: ReservationCreate, user_id: UUID, sessi
     )
     
     session.add(new_reservation)
-    session.commit()
+    add_to_daily_stats(session, new_reservation)
+    publish(session, "availability", [new_reservation.reservation_date])
+    commit_reservation(session)
     session.refresh(new_reservation)
     
     return new_reservation
@@ -363,7 +527,9 @@ def create_reservation(reservation_data: ReservationCreate, user_id: UUID, sessi
 
 def get_reservations_by_date(query_date: date, session: Session):
     reservations = session.exec(
-        select(Reservation).where(Reservation.reservation_date == query_date)
+        select(Reservation)
+        .options(RESERVATION_TABLE_INFO)
+        .where(Reservation.reservation_date == query_date)
     ).all()
     
     return reservations
@@ -383,57 +549,56 @@ def get_reservation_statistics(period: str, session: Session):
     else:
         start_date = today - timedelta(days=7)  # Default to week
     
-    # Get all reservations in the period
-    reservations = session.exec(
-        select(Reservation).where(Reservation.reservation_date >= start_date)
-    ).all()
+    # Read the per (date, table) rollup instead of scanning reservations
+    in_period = and_(
+        ReservationDailyStats.stat_date >= start_date,
+        ReservationDailyStats.reservation_count > 0
+    )
     
-    # Total reservations
-    total_reservations = len(reservations)
+    # Totals for the averages
+    total_reservations, total_guests, total_duration = session.exec(
+        select(
+            func.coalesce(func.sum(ReservationDailyStats.reservation_count), 0),
+            func.coalesce(func.sum(ReservationDailyStats.guests_sum), 0),
+            func.coalesce(func.sum(ReservationDailyStats.duration_sum), 0)
+        ).where(in_period)
+    ).one()
     
     # Reservations by date
-    reservations_by_date = {}
-    for res in reservations:
-        date_str = res.reservation_date.isoformat()
-        if date_str in reservations_by_date:
-            reservations_by_date[date_str] += 1
-        else:
-            reservations_by_date[date_str] = 1
+    date_counts = session.exec(
+        select(ReservationDailyStats.stat_date, func.sum(ReservationDailyStats.reservation_count))
+        .where(in_period)
+        .group_by(ReservationDailyStats.stat_date)
+        .order_by(ReservationDailyStats.stat_date)
+    ).all()
+    reservations_by_date = {
+        stat_date.isoformat(): count for stat_date, count in date_counts
+    }
     
-    # Reservations by table
-    reservations_by_table = {}
-    tables = session.exec(select(Table).where(Table.is_active == True)).all()
-    
-    # Create a table map with display names if available
-    table_map = {}
-    for table in tables:
-        table_id = str(table.id)
-        if hasattr(table, 'display_name') and table.display_name:
-            table_map[table_id] = table.display_name
-        elif table.type_id:
-            # Try to get the type display name
-            table_type = session.get(TableType, table.type_id)
-            if table_type:
-                table_map[table_id] = f"{table_type.display_name} №{table.table_number}"
-            else:
-                table_map[table_id] = f"Столик №{table.table_number}"
-        else:
-            table_map[table_id] = f"Столик №{table.table_number}"
+    # Reservations by table, named after the table type
+    table_counts = session.exec(
+        select(
+            ReservationDailyStats.table_id, Table.table_number, Table.is_active, TableType.display_name,
+            func.sum(ReservationDailyStats.reservation_count)
+        )
+        .join(Table, Table.id == ReservationDailyStats.table_id)
+        .outerjoin(TableType, TableType.id == Table.type_id)
+        .where(in_period)
+        .group_by(ReservationDailyStats.table_id, Table.table_number, Table.is_active, TableType.display_name)
+    ).all()
     
-    for res in reservations:
-        table_id = str(res.table_id)
-        table_name = table_map.get(table_id, table_id)
-        if table_name in reservations_by_table:
-            reservations_by_table[table_name] += 1
+    reservations_by_table = {}
+    for table_id, table_number, is_active, type_display_name, count in table_counts:
+        if not is_active:
+            # Inactive tables are reported by ID
+            table_name = str(table_id)
+        elif type_display_name:
+            table_name = f"{type_display_name} №{table_number}"
         else:
-            reservations_by_table[table_name] = 1
+            table_name = f"Столик №{table_number}"
+        reservations_by_table[table_name] = reservations_by_table.get(table_name, 0) + count
     
-    # Average guests per reservation
-    total_guests = sum(r.guests_count for r in reservations)
     average_guests = total_guests / total_reservations if total_reservations > 0 else 0
-    
-    # Average duration of reservations
-    total_duration = sum(r.duration for r in reservations)
     average_duration = total_duration / total_reservations if total_reservations > 0 else 0
     
     return {
@@ -445,118 +610,78 @@ def get_reservation_statistics(period: str, session: Session):
     }
 
 
+def get_reservation_series(start_date: date, end_date: date, bucket: str, session: Session):
+    """
+    Get reservation statistics for a date range as a time series of
+    day/week/month buckets, grouped in SQL over the daily rollup
+    """
+    bucket_date = bucket_column(bucket, ReservationDailyStats.stat_date).label("bucket_start")
+    rows = session.exec(
+        select(
+            bucket_date,
+            func.sum(ReservationDailyStats.reservation_count),
+            func.sum(ReservationDailyStats.cancelled_count),
+            func.sum(ReservationDailyStats.guests_sum),
+            func.sum(ReservationDailyStats.duration_sum)
+        )
+        .where(
+            ReservationDailyStats.stat_date >= start_date,
+            ReservationDailyStats.stat_date <= end_date
+        )
+        .group_by(bucket_date)
+    ).all()
+    totals = {row[0]: row[1:] for row in rows}
+    
+    # Empty buckets are reported as zeros so that charts get a continuous axis
+    buckets = []
+    for start in bucket_starts(start_date, end_date, bucket):
+        count, cancelled, guests, duration = totals.get(start, (0, 0, 0, 0))
+        buckets.append({
+            "bucket_start": start,
+            "reservations": count,
+            "cancelled": cancelled,
+            "guests": guests,
+            "average_guests": round(guests / count, 1) if count > 0 else 0,
+            "average_duration": round(duration / count, 1) if count > 0 else 0
+        })
+    
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "bucket": bucket,
+        "buckets": buckets
+    }
+
+
 def get_user_reservations(user_id: UUID, session: Session):
     """
     Get all reservations for a specific user
     """
     reservations = session.exec(
-        select(Reservation).where(Reservation.user_id == user_id)
+        select(Reservation)
+        .options(RESERVATION_TABLE_INFO)
+        .where(Reservation.user_id == user_id)
     ).all()
     
-    # Prepare enhanced reservations with table data
-    enhanced_reservations = []
-    for reservation in reservations:
-        # Create a reservation dict
-        reservation_dict = {
-            "id": str(reservation.id),
-            "user_id": str(reservation.user_id),
-            "table_id": str(reservation.table_id),
-            "reservation_date": reservation.reservation_date,
-            "reservation_time": reservation.reservation_time,
-            "duration": reservation.duration,
-            "guests_count": reservation.guests_count,
-            "first_name": reservation.first_name,
-            "last_name": reservation.last_name,
-            "phone": reservation.phone,
-            "status": reservation.status
-        }
-        
-        # Load the table
-        table = session.get(Table, reservation.table_id)
-        if table:
-            table_dict = {
-                "id": str(table.id),
-                "type_id": table.type_id,
-                "table_number": table.table_number,
-                "width": table.width,
-                "height": table.height
-            }
-            
-            # Load the table type if available
-            if table.type_id:
-                table_type = session.get(TableType, table.type_id)
-                if table_type:
-                    table_dict["table_type"] = {
-                        "id": table_type.id,
-                        "name": table_type.name,
-                        "display_name": table_type.display_name,
-                        "default_width": table_type.default_width,
-                        "default_height": table_type.default_height,
-                        "default_max_guests": table_type.default_max_guests,
-                        "color_code": table_type.color_code
-                    }
-            
-            reservation_dict["table"] = table_dict
-        
-        enhanced_reservations.append(reservation_dict)
-    
-    return enhanced_reservations
+    return [serialize_reservation(reservation) for reservation in reservations]
 
 
 def get_reservation_by_id(reservation_id: UUID, session: Session):
     """
     Get a specific reservation by ID
     """
-    reservation = session.get(Reservation, reservation_id)
+    reservation = session.exec(
+        select(Reservation)
+        .options(RESERVATION_TABLE_INFO)
+        .where(Reservation.id == reservation_id)
+    ).first()
     if not reservation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Бронирование не найдено"
         )
     
-    # Create a reservation dictionary
-    reservation_dict = {
-        "id": str(reservation.id),
-        "user_id": str(reservation.user_id),
-        "table_id": str(reservation.table_id),
-        "reservation_date": reservation.reservation_date,
-        "reservation_time": reservation.reservation_time,
-        "duration": reservation.duration,
-        "guests_count": reservation.guests_count,
-        "first_name": reservation.first_name,
-        "last_name": reservation.last_name,
-        "phone": reservation.phone,
-        "status": reservation.status
-    }
-    
-    # Load the table
-    table = session.get(Table, reservation.table_id)
-    if table:
-        table_dict = {
-            "id": str(table.id),
-            "type_id": table.type_id,
-            "table_number": table.table_number,
-            "width": table.width,
-            "height": table.height
-        }
-        
-        # Load the table type if available
-        if table.type_id:
-            table_type = session.get(TableType, table.type_id)
-            if table_type:
-                table_dict["table_type"] = {
-                    "id": table_type.id,
-                    "name": table_type.name,
-                    "display_name": table_type.display_name,
-                    "default_width": table_type.default_width,
-                    "default_height": table_type.default_height,
-                    "default_max_guests": table_type.default_max_guests,
-                    "color_code": table_type.color_code
-                }
-        
-        reservation_dict["table"] = table_dict
-    
-    return reservation_dict
+    return serialize_reservation(reservation)
 
 
 def update_reservation(reservation_id: UUID, updated_data: ReservationCreate, session: Session):
@@ -629,6 +754,9 @@ def update_reservation(reservation_id: UUID, updated_data: ReservationCreate, se
             detail=f"Минимальное количество гостей для этого столика - {min_required_guests}"
         )
     
+    # Hold the (table, date) lock until commit so the check below stays valid
+    lock_table_date(session, table.id, updated_data.reservation_date)
+    
     # Check availability based on table type
     is_banquet_hall = table.type_id == BANQUET_HALL_TYPE_ID
     
@@ -650,17 +778,15 @@ def update_reservation(reservation_id: UUID, updated_data: ReservationCreate, se
                 detail="Банкетный зал уже забронирован на эту дату"
             )
     else:
-        # For regular tables, check specific time slot availability
-        existing_reservation = session.exec(
-            select(Reservation).where(
-                and_(
-                    Reservation.table_id == updated_data.table_id,
-                    Reservation.reservation_date == updated_data.reservation_date,
-                    Reservation.reservation_time == updated_data.reservation_time,
-                    Reservation.id != reservation_id
-                )
-            )
-        ).first()
+        # For regular tables, check the whole requested range, not just the start time
+        existing_reservation = find_overlapping_reservation(
+            session,
+            updated_data.table_id,
+            updated_data.reservation_date,
+            updated_data.reservation_time,
+            updated_data.duration,
+            exclude_id=reservation_id
+        )
         
         if existing_reservation:
             raise HTTPException(
@@ -669,6 +795,8 @@ def update_reservation(reservation_id: UUID, updated_data: ReservationCreate, se
             )
     
     # Update the reservation
+    previous_date = reservation.reservation_date
+    remove_from_daily_stats(session, reservation)
     reservation.table_id = updated_data.table_id
     reservation.reservation_date = updated_data.reservation_date
     reservation.reservation_time = updated_data.reservation_time
@@ -679,52 +807,11 @@ def update_reservation(reservation_id: UUID, updated_data: ReservationCreate, se
     reservation.phone = updated_data.phone
     
     session.add(reservation)
-    session.commit()
-    session.refresh(reservation)
-    
-    # Create a dictionary representation of the updated reservation with table information
-    reservation_dict = {
-        "id": str(reservation.id),
-        "user_id": str(reservation.user_id),
-        "table_id": str(reservation.table_id),
-        "reservation_date": reservation.reservation_date,
-        "reservation_time": reservation.reservation_time,
-        "duration": reservation.duration,
-        "guests_count": reservation.guests_count,
-        "first_name": reservation.first_name,
-        "last_name": reservation.last_name,
-        "phone": reservation.phone,
-        "status": reservation.status
-    }
+    add_to_daily_stats(session, reservation)
+    publish(session, "availability", [previous_date, reservation.reservation_date])
+    commit_reservation(session)
     
-    # Add table information to the response
-    updated_table = session.get(Table, reservation.table_id)
-    if updated_table:
-        table_dict = {
-            "id": str(updated_table.id),
-            "type_id": updated_table.type_id,
-            "table_number": updated_table.table_number,
-            "width": updated_table.width,
-            "height": updated_table.height
-        }
-        
-        # Add table type information if available
-        if updated_table.type_id:
-            table_type = session.get(TableType, updated_table.type_id)
-            if table_type:
-                table_dict["table_type"] = {
-                    "id": table_type.id,
-                    "name": table_type.name,
-                    "display_name": table_type.display_name,
-                    "default_width": table_type.default_width,
-                    "default_height": table_type.default_height,
-                    "default_max_guests": table_type.default_max_guests,
-                    "color_code": table_type.color_code
-                }
-        
-        reservation_dict["table"] = table_dict
-    
-    return reservation_dict
+    return get_reservation_by_id(reservation.id, session)
 
 
 def update_reservation_status(reservation_id: UUID, status: str, session: Session):
@@ -740,52 +827,12 @@ def update_reservation_status(reservation_id: UUID, status: str, session: Sessio
         )
     
     # Update just the status
+    remove_from_daily_stats(session, reservation)
     reservation.status = status
     
     session.add(reservation)
+    add_to_daily_stats(session, reservation)
+    publish(session, "availability", [reservation.reservation_date])
     session.commit()
-    session.refresh(reservation)
-    
-    # Create a dictionary representation of the updated reservation
-    reservation_dict = {
-        "id": str(reservation.id),
-        "user_id": str(reservation.user_id),
-        "table_id": str(reservation.table_id),
-        "reservation_date": reservation.reservation_date,
-        "reservation_time": reservation.reservation_time,
-        "duration": reservation.duration,
-        "guests_count": reservation.guests_count,
-        "first_name": reservation.first_name,
-        "last_name": reservation.last_name,
-        "phone": reservation.phone,
-        "status": reservation.status
-    }
-    
-    # Add table information to the response
-    table = session.get(Table, reservation.table_id)
-    if table:
-        table_dict = {
-            "id": str(table.id),
-            "type_id": table.type_id,
-            "table_number": table.table_number,
-            "width": table.width,
-            "height": table.height
-        }
-        
-        # Add table type information if available
-        if table.type_id:
-            table_type = session.get(TableType, table.type_id)
-            if table_type:
-                table_dict["table_type"] = {
-                    "id": table_type.id,
-                    "name": table_type.name,
-                    "display_name": table_type.display_name,
-                    "default_width": table_type.default_width,
-                    "default_height": table_type.default_height,
-                    "default_max_guests": table_type.default_max_guests,
-                    "color_code": table_type.color_code
-                }
-        
-        reservation_dict["table"] = table_dict
     
-    return reservation_dict 
\ No newline at end of file
+    return get_reservation_by_id(reservation.id, session)
@@ -0,0 +1,116 @@
+from datetime import date
+import numpy as np
+from sqlalchemy import Integer, cast, distinct, extract
+from sqlmodel import Session, select, func, and_
+from db.models import Reservation, Table, TableType
+from .services import OPENING_HOUR, TIME_SLOTS, BANQUET_HALL_TYPE_ID
+
+
+def _percent(booked, capacity):
+    """Element-wise booked/capacity in percent, 0 where there is no capacity"""
+    booked = np.asarray(booked, dtype=float)
+    capacity = np.broadcast_to(np.asarray(capacity, dtype=float), booked.shape)
+    result = np.zeros(booked.shape)
+    np.divide(booked * 100, capacity, out=result, where=capacity > 0)
+    return np.round(result, 1).tolist()
+
+
+def get_table_utilization(start_date: date, end_date: date, session: Session):
+    """
+    Build the tables x TIME_SLOTS occupancy matrix of active tables for a
+    date range and return utilization percentages per table, table type and
+    hour. Cancelled reservations do not occupy a table.
+    """
+    days = (end_date - start_date).days + 1
+    slots = len(TIME_SLOTS)
+
+    tables = session.exec(
+        select(Table.id, Table.table_number, Table.type_id, TableType.display_name)
+        .outerjoin(TableType, TableType.id == Table.type_id)
+        .where(Table.is_active == True)
+        .order_by(Table.type_id, Table.table_number)
+    ).all()
+    table_index = {table_id: i for i, (table_id, _, _, _) in enumerate(tables)}
+    table_types = np.array([type_id for _, _, type_id, _ in tables], dtype=np.int64)
+
+    in_range = and_(
+        Reservation.reservation_date >= start_date,
+        Reservation.reservation_date <= end_date,
+        Reservation.status != "cancelled"
+    )
+
+    # Let the database collapse the reservations to one row per distinct
+    # (table, start hour, duration), so a year of bookings stays small
+    start_hour = cast(extract("hour", Reservation.reservation_time), Integer)
+    groups = session.exec(
+        select(Reservation.table_id, start_hour, Reservation.duration, func.count())
+        .join(Table, Table.id == Reservation.table_id)
+        .where(in_range, Table.is_active == True, Table.type_id != BANQUET_HALL_TYPE_ID)
+        .group_by(Reservation.table_id, start_hour, Reservation.duration)
+    ).all()
+
+    # Vectorized interval expansion: +count at the first booked slot and
+    # -count after the last one, then a cumulative sum along the hours
+    delta = np.zeros((len(tables), slots + 1), dtype=np.int64)
+    if groups:
+        table_ids, hours, durations, counts = zip(*groups)
+        rows = np.fromiter((table_index[table_id] for table_id in table_ids), dtype=np.int64, count=len(groups))
+        first = np.clip(np.asarray(hours, dtype=np.int64) - OPENING_HOUR, 0, slots)
+        last = np.clip(first + np.asarray(durations, dtype=np.int64), 0, slots)
+        counts = np.asarray(counts, dtype=np.int64)
+        np.add.at(delta, (rows, first), counts)
+        np.add.at(delta, (rows, last), -counts)
+    occupancy = np.cumsum(delta, axis=1)[:, :slots]
+
+    # Any reservation books the banquet hall for the whole day
+    banquet_days = session.exec(
+        select(Reservation.table_id, func.count(distinct(Reservation.reservation_date)))
+        .join(Table, Table.id == Reservation.table_id)
+        .where(in_range, Table.is_active == True, Table.type_id == BANQUET_HALL_TYPE_ID)
+        .group_by(Reservation.table_id)
+    ).all()
+    for table_id, booked_days in banquet_days:
+        occupancy[table_index[table_id], :] = booked_days
+
+    # Per table type: sum the rows of the tables of each type
+    type_ids, type_rows = np.unique(table_types, return_inverse=True)
+    type_names = {type_id: name for _, _, type_id, name in tables}
+    type_occupancy = np.zeros((len(type_ids), slots), dtype=np.int64)
+    np.add.at(type_occupancy, type_rows, occupancy)
+    type_tables = np.bincount(type_rows, minlength=len(type_ids))
+
+    table_hours = _percent(occupancy, days)
+    table_totals = _percent(occupancy.sum(axis=1), days * slots)
+    type_hours = _percent(type_occupancy, type_tables[:, None] * days)
+    type_totals = _percent(type_occupancy.sum(axis=1), type_tables * days * slots)
+    hour_totals = _percent(occupancy.sum(axis=0), len(tables) * days)
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": days,
+        "hours": [slot.hour for slot in TIME_SLOTS],
+        "overall": _percent(occupancy.sum(), len(tables) * days * slots),
+        "by_table": [
+            {
+                "table_id": table_id,
+                "table_number": table_number,
+                "type_id": type_id,
+                "type_name": type_name,
+                "utilization": table_totals[i],
+                "by_hour": table_hours[i]
+            }
+            for i, (table_id, table_number, type_id, type_name) in enumerate(tables)
+        ],
+        "by_type": [
+            {
+                "type_id": int(type_id),
+                "type_name": type_names[type_id],
+                "tables": int(type_tables[i]),
+                "utilization": type_totals[i],
+                "by_hour": type_hours[i]
+            }
+            for i, type_id in enumerate(type_ids)
+        ],
+        "by_hour": hour_totals
+    }
@@ -1,7 +1,7 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime, time
 
 
 class RoomBase(BaseModel):
@@ -15,6 +15,8 @@ class RoomCreate(RoomBase):
 
 class RoomRead(RoomBase):
     id: UUID
+    layout_version: int = 0
+    is_default: bool = False
     created_at: datetime
     updated_at: datetime
 
@@ -139,6 +141,91 @@ class Layout(BaseModel):
         orm_mode = True
 
 
+class LayoutHit(BaseModel):
+    kind: str  # "table", "static_item" or "wall"
+    item: Dict[str, Any]
+
+
+class LayoutConflictItem(BaseModel):
+    kind: str  # "table", "static_item" or "wall"
+    index: int  # Position in the layout's list of that kind
+    id: Optional[UUID] = None
+
+
+class LayoutConflict(BaseModel):
+    type: str  # "overlap", "wall" or "bounds"
+    items: List[LayoutConflictItem]
+
+
+class LayoutValidation(BaseModel):
+    valid: bool
+    conflicts: List[LayoutConflict] = []
+
+
+class LayoutChangeCounts(BaseModel):
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+
+
+class LayoutChanges(BaseModel):
+    tables: LayoutChangeCounts
+    static_items: LayoutChangeCounts
+    walls: LayoutChangeCounts
+
+
+class ReservationMove(BaseModel):
+    id: UUID
+    reservation_date: date
+    reservation_time: time
+    guests_count: int
+    from_table_id: UUID
+    to_table_id: Optional[UUID] = None  # None when no table could take it
+
+
+class LayoutReassignment(BaseModel):
+    moved: List[ReservationMove] = []
+    unplaceable: List[ReservationMove] = []
+
+
+class LayoutSaveResult(Layout):
+    changes: LayoutChanges
+    version: int = 0
+    reassignment: LayoutReassignment = LayoutReassignment()
+
+
+class LayoutOperation(BaseModel):
+    op: str  # "move", "rotate", "resize", "add" or "remove"
+    kind: str  # "table", "static_item" or "wall"
+    id: Optional[UUID] = None  # Required by every operation except "add"
+    x: Optional[int] = None
+    y: Optional[int] = None
+    rotation: Optional[int] = None
+    width: Optional[int] = None  # Tables only
+    height: Optional[int] = None  # Tables only
+    length: Optional[int] = None  # Walls only
+    item: Optional[Dict[str, Any]] = None  # TableCreate, StaticItemCreate or WallCreate for "add"
+
+
+class LayoutPatch(BaseModel):
+    operations: List[LayoutOperation]
+
+
+class LayoutPatchResult(BaseModel):
+    changes: LayoutChanges
+    added_ids: List[UUID] = []
+    version: int = 0
+    reassignment: LayoutReassignment = LayoutReassignment()
+
+
+class LayoutSnapshotInfo(BaseModel):
+    version: int
+    created_at: datetime
+    tables: int
+    static_items: int
+    walls: int
+
+
 class EnhancedLayout(BaseModel):
     tables: List[TableFullRead]
     static_items: List[StaticItemRead]
@@ -1,3 +1,4 @@
+from datetime import date
 from typing import List, Optional, Dict
 from uuid import UUID
 from pydantic import BaseModel
@@ -69,4 +70,27 @@ class OrderStats(BaseModel):
     total_orders: int
     items_sold: Dict[str, int]
     items_by_category: Dict[str, int]
-    total_revenue: float 
\ No newline at end of file
+    total_revenue: float
+
+
+class SalesBucket(BaseModel):
+    bucket_start: date
+    quantity: int
+    revenue: float
+
+
+class SalesSeries(BaseModel):
+    id: Optional[UUID] = None
+    name: str
+    quantity: int
+    revenue: float
+    buckets: List[SalesBucket]
+
+
+class OrderStatsSeries(BaseModel):
+    start_date: date
+    end_date: date
+    bucket: str
+    totals: List[SalesBucket]
+    items: List[SalesSeries]
+    categories: List[SalesSeries]
@@ -60,6 +60,18 @@ class TableAvailability(BaseModel):
     available_times: Optional[List[time]] = None
 
 
+class DayAvailability(BaseModel):
+    date: date
+    tables: List[TableAvailability]
+
+
+class AvailabilityRange(BaseModel):
+    start_date: date
+    end_date: date
+    duration: int
+    days: List[DayAvailability]
+
+
 class ReservationStats(BaseModel):
     total_reservations: int
     reservations_by_date: Dict[str, int]
@@ -68,5 +80,49 @@ class ReservationStats(BaseModel):
     average_duration: float
 
 
+class ReservationStatsBucket(BaseModel):
+    bucket_start: date
+    reservations: int
+    cancelled: int
+    guests: int
+    average_guests: float
+    average_duration: float
+
+
+class ReservationStatsSeries(BaseModel):
+    start_date: date
+    end_date: date
+    bucket: str
+    buckets: List[ReservationStatsBucket]
+
+
+class TableUtilization(BaseModel):
+    table_id: UUID
+    table_number: int
+    type_id: int
+    type_name: Optional[str] = None
+    utilization: float
+    by_hour: List[float]
+
+
+class TableTypeUtilization(BaseModel):
+    type_id: int
+    type_name: Optional[str] = None
+    tables: int
+    utilization: float
+    by_hour: List[float]
+
+
+class UtilizationReport(BaseModel):
+    start_date: date
+    end_date: date
+    days: int
+    hours: List[int]
+    overall: float
+    by_table: List[TableUtilization]
+    by_type: List[TableTypeUtilization]
+    by_hour: List[float]
+
+
 class ReservationStatusUpdate(BaseModel):
     status: str 
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the backend packages (db, layout, reservations, ...) importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,29 @@
+from datetime import date, time
+
+from reservations.cache import AvailabilityCache
+
+DAY = date(2030, 1, 1)
+KEY = (DAY, time(18), 2, None, None)
+
+
+def test_put_keeps_an_answer_computed_without_invalidation():
+    cache = AvailabilityCache()
+    generation = cache.generation
+    cache.put(KEY, ["free"], generation)
+    assert cache.get(KEY) == ["free"]
+
+
+def test_put_drops_an_answer_computed_across_an_invalidation():
+    cache = AvailabilityCache()
+    generation = cache.generation
+    cache.invalidate_dates([DAY])
+    cache.put(KEY, ["stale"], generation)
+    assert cache.get(KEY) is None
+
+
+def test_put_drops_an_answer_computed_across_a_clear():
+    cache = AvailabilityCache()
+    generation = cache.generation
+    cache.clear()
+    cache.put(KEY, ["stale"], generation)
+    assert cache.get(KEY) is None
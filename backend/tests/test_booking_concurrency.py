@@ -0,0 +1,104 @@
+"""
+Concurrent bookings of one slot against a real PostgreSQL database (the
+DATABASE_URL one, bootstrapped by the test). Skipped when it is unreachable.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, create_engine, select
+
+from db.database import DATABASE_URL, engine
+from db.models import Reservation, ReservationDailyStats, Room, Table, User
+
+try:
+    with engine.connect():
+        pass
+except OperationalError:
+    pytest.skip("PostgreSQL is not reachable", allow_module_level=True)
+
+from db.bootstrap import bootstrap
+from reservations.services import OPENING_HOUR, create_reservation
+from schemas.reservation import ReservationCreate
+
+# Parallel booking attempts and the threads (and connections) firing them
+BOOKING_REQUESTS = int(os.getenv("STRESS_BOOKING_REQUESTS", "100"))
+BOOKING_WORKERS = int(os.getenv("STRESS_BOOKING_WORKERS", "20"))
+
+
+@pytest.fixture
+def table_and_user():
+    bootstrap()
+    with Session(engine) as session:
+        # A table of its own, so every slot of the day is free
+        room = Room(name=f"test-{uuid4().hex[:8]}")
+        user = User(email=f"stress-{uuid4()}@example.com", password_hash="-")
+        session.add_all([room, user])
+        session.commit()
+        table = Table(type_id=1, table_number=1, max_guests=4, x=0, y=0, room_id=room.id)
+        session.add(table)
+        session.commit()
+        ids = table.id, user.id, room.id
+
+    yield ids[:2]
+
+    table_id, user_id, room_id = ids
+    with Session(engine) as session:
+        session.execute(delete(ReservationDailyStats).where(ReservationDailyStats.table_id == table_id))
+        session.execute(delete(Reservation).where(Reservation.table_id == table_id))
+        session.execute(delete(Table).where(Table.id == table_id))
+        session.execute(delete(Room).where(Room.id == room_id))
+        session.execute(delete(User).where(User.id == user_id))
+        session.commit()
+
+
+def test_parallel_bookings_of_one_slot_book_it_once(table_and_user):
+    table_id, user_id = table_and_user
+    reservation_data = ReservationCreate(
+        table_id=table_id,
+        reservation_date=date.today() + timedelta(days=1),
+        reservation_time=time(hour=OPENING_HOUR),
+        duration=1,
+        guests_count=4,
+        first_name="Stress",
+        last_name="Test",
+        phone="+70000000000"
+    )
+
+    # A dedicated engine so that every worker thread gets its own connection
+    stress_engine = create_engine(DATABASE_URL, pool_size=BOOKING_WORKERS, max_overflow=0)
+    start = threading.Barrier(min(BOOKING_REQUESTS, BOOKING_WORKERS))
+
+    def book(_):
+        try:
+            start.wait(timeout=30)
+        except threading.BrokenBarrierError:
+            pass
+        with Session(stress_engine) as session:
+            try:
+                create_reservation(reservation_data, user_id, session)
+            except HTTPException:
+                return "rejected"
+            except Exception as e:
+                return f"error: {e}"
+        return "booked"
+
+    try:
+        with ThreadPoolExecutor(max_workers=BOOKING_WORKERS) as executor:
+            outcomes = list(executor.map(book, range(BOOKING_REQUESTS)))
+    finally:
+        stress_engine.dispose()
+
+    errors = [outcome for outcome in outcomes if outcome.startswith("error")]
+    assert errors == []
+    assert outcomes.count("booked") == 1
+    with Session(engine) as session:
+        stored = session.exec(select(Reservation).where(Reservation.table_id == table_id)).all()
+    assert len(stored) == 1
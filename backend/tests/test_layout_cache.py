@@ -0,0 +1,98 @@
+"""
+Cached layout representations against a real PostgreSQL database (the
+DATABASE_URL one, bootstrapped by the test). Skipped when it is unreachable.
+"""
+
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, func, select
+
+from db.database import engine
+from db.models import LayoutSnapshot, Room, Table, TableType, User
+
+try:
+    with engine.connect():
+        pass
+except OperationalError:
+    pytest.skip("PostgreSQL is not reachable", allow_module_level=True)
+
+from fastapi.testclient import TestClient
+
+import main
+from db.bootstrap import bootstrap
+from utils.security import get_current_admin
+from layout.compact import COMPACT_LAYOUT_MEDIA_TYPE
+
+
+@pytest.fixture
+def room_with_type():
+    bootstrap()
+    with Session(engine) as session:
+        # Type ids are assigned explicitly, like init_table_types does
+        next_id = (session.exec(select(func.max(TableType.id))).one() or 0) + 1
+        table_type = TableType(
+            id=next_id,
+            name=f"test-{uuid4().hex[:8]}",
+            display_name="Test table",
+            default_width=80,
+            default_height=80,
+            default_max_guests=4
+        )
+        room = Room(name=f"test-{uuid4().hex[:8]}")
+        session.add_all([table_type, room])
+        session.commit()
+        session.add(Table(type_id=table_type.id, table_number=1, max_guests=4, x=100, y=100, room_id=room.id))
+        session.commit()
+        room_id, type_id = room.id, table_type.id
+
+    yield room_id, type_id
+
+    with Session(engine) as session:
+        session.execute(delete(LayoutSnapshot).where(LayoutSnapshot.room_id == room_id))
+        session.execute(delete(Table).where(Table.room_id == room_id))
+        session.execute(delete(Room).where(Room.id == room_id))
+        session.execute(delete(TableType).where(TableType.id == type_id))
+        session.commit()
+
+
+@pytest.fixture
+def client():
+    main.app.dependency_overrides[get_current_admin] = lambda: User(email="admin@test", password_hash="x", role="admin")
+    yield TestClient(main.app)
+    main.app.dependency_overrides.pop(get_current_admin, None)
+
+
+def test_table_type_edit_changes_json_and_compact_layouts(room_with_type, client):
+    room_id, type_id = room_with_type
+    params = {"room_id": str(room_id)}
+    compact = {"Accept": COMPACT_LAYOUT_MEDIA_TYPE}
+
+    full_before = client.get("/layout/enhanced", params=params)
+    compact_before = client.get("/layout/enhanced", params=params, headers=compact)
+    assert compact_before.headers["content-type"] == COMPACT_LAYOUT_MEDIA_TYPE
+
+    table_type = client.get(f"/layout/table-types/{type_id}").json()
+    table_type.pop("id")
+    response = client.put(
+        f"/layout/table-types/{type_id}",
+        json={**table_type, "display_name": "Renamed table", "default_width": 120}
+    )
+    assert response.status_code == 200
+
+    full_after = client.get(
+        "/layout/enhanced", params=params, headers={"If-None-Match": full_before.headers["etag"]}
+    )
+    compact_after = client.get(
+        "/layout/enhanced", params=params, headers={**compact, "If-None-Match": compact_before.headers["etag"]}
+    )
+
+    assert full_after.status_code == 200
+    assert full_after.headers["etag"] != full_before.headers["etag"]
+    assert full_after.json()["tables"][0]["table_type"]["display_name"] == "Renamed table"
+
+    assert compact_after.status_code == 200
+    assert compact_after.headers["etag"] != compact_before.headers["etag"]
+    assert compact_after.json()["table_types"][str(type_id)]["default_width"] == 120
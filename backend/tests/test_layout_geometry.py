@@ -0,0 +1,93 @@
+"""
+Layout geometry checks, with tables placed the way the editor stores them:
+(x, y) is the top-left corner of the table.
+"""
+
+import random
+
+from layout.geometry import Shapes, candidate_pairs
+from layout.spatial import SpatialIndex
+from layout.validation import find_conflicts
+
+
+def _table(x, y, width=None, height=None, rotation=0, type_name="circular", item_id=None):
+    return {
+        "id": item_id,
+        "x": x,
+        "y": y,
+        "rotation": rotation,
+        "width": width,
+        "height": height,
+        "table_type": {"name": type_name},
+    }
+
+
+def _layout(*tables, walls=()):
+    return {"tables": list(tables), "static_items": [], "walls": list(walls)}
+
+
+def test_table_flush_against_the_room_edge_is_in_bounds():
+    assert find_conflicts(_layout(_table(0, 0, 60, 60))) == []
+
+
+def test_table_past_the_room_edge_is_out_of_bounds():
+    conflicts = find_conflicts(_layout(_table(-20, 0, 60, 60)))
+    assert [conflict["type"] for conflict in conflicts] == ["bounds"]
+
+
+def test_overlapping_tables_of_different_widths():
+    # A spans x 100..300, B spans x 250..310
+    conflicts = find_conflicts(_layout(_table(100, 100, 200, 60), _table(250, 100, 60, 60)))
+    assert [conflict["type"] for conflict in conflicts] == ["overlap"]
+    assert [item["index"] for item in conflicts[0]["items"]] == [0, 1]
+
+
+def test_tables_side_by_side_do_not_overlap():
+    assert find_conflicts(_layout(_table(100, 100, 200, 60), _table(300, 100, 60, 60))) == []
+
+
+def test_default_sizes_match_the_editor():
+    # 80 x 80 by default: a table at x=0 reaches x=80
+    assert find_conflicts(_layout(_table(0, 0), _table(81, 0))) == []
+    assert len(find_conflicts(_layout(_table(0, 0), _table(70, 0)))) == 1
+    # 200 x 100 for a banquet hall
+    assert len(find_conflicts(_layout(_table(0, 0, type_name="banquet"), _table(150, 0)))) == 1
+
+
+def test_rotated_table_turns_about_its_center():
+    # 200 x 40 at (100, 100), turned 90 degrees: spans x 180..220, y 20..220
+    layout = _layout(_table(100, 100, 200, 40, rotation=90), _table(100, 100, 60, 60))
+    assert find_conflicts(layout) == []
+
+
+def test_table_crossing_a_wall():
+    wall = {"id": None, "x": 0, "y": 130, "rotation": 0, "length": 500}
+    conflicts = find_conflicts(_layout(_table(100, 100, 60, 60), walls=[wall]))
+    assert [conflict["type"] for conflict in conflicts] == ["wall"]
+
+
+def test_hit_test_uses_the_top_left_corner():
+    index = SpatialIndex(_layout(_table(100, 100, 60, 60)))
+    assert len(index.hit_test(105, 105)) == 1
+    assert len(index.hit_test(155, 155)) == 1
+    assert len(index.hit_test(95, 95)) == 0
+
+
+def test_candidate_pairs_match_brute_force():
+    rng = random.Random(7)
+    tables = [
+        _table(rng.uniform(0, 1500), rng.uniform(0, 1500), rng.choice([None, 40, 450]), rotation=rng.choice([0, 30, 90]))
+        for _ in range(60)
+    ]
+    walls = [
+        {"x": rng.uniform(0, 1500), "y": rng.uniform(0, 1500), "rotation": rng.choice([0, 90, 33]), "length": rng.uniform(10, 1500)}
+        for _ in range(8)
+    ]
+    shapes = Shapes(_layout(*tables, walls=walls))
+    expected = [
+        (i, j) for i in range(len(shapes)) for j in range(i + 1, len(shapes))
+        if shapes.xmin[i] <= shapes.xmax[j] and shapes.xmin[j] <= shapes.xmax[i]
+        and shapes.ymin[i] <= shapes.ymax[j] and shapes.ymin[j] <= shapes.ymax[i]
+    ]
+    i, j = candidate_pairs(shapes)
+    assert list(zip(i.tolist(), j.tolist())) == expected
@@ -0,0 +1,81 @@
+"""
+Layout versions and snapshots against a real PostgreSQL database (the
+DATABASE_URL one, bootstrapped by the test). Skipped when it is unreachable.
+"""
+
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from db.database import engine
+from db.models import LayoutSnapshot, Room, StaticItem, Table, Wall
+
+try:
+    with engine.connect():
+        pass
+except OperationalError:
+    pytest.skip("PostgreSQL is not reachable", allow_module_level=True)
+
+from db.bootstrap import bootstrap
+from layout.services import patch_layout, save_layout
+from layout.versions import get_snapshot, get_snapshots
+from schemas.layout import LayoutPatch, LayoutUpdate
+
+
+@pytest.fixture
+def room_id():
+    bootstrap()
+    with Session(engine) as session:
+        room = Room(name=f"test-{uuid4().hex[:8]}")
+        session.add(room)
+        session.commit()
+        room_id = room.id
+
+    yield room_id
+
+    with Session(engine) as session:
+        for model in (LayoutSnapshot, Table, StaticItem, Wall):
+            session.execute(delete(model).where(model.room_id == room_id))
+        session.execute(delete(Room).where(Room.id == room_id))
+        session.commit()
+
+
+def _layout(table_id, item_id, table_x, item_xy):
+    return LayoutUpdate.parse_obj({
+        "tables": [{"id": table_id, "type_id": 1, "table_number": 1, "max_guests": 2, "x": table_x, "y": 0}],
+        "static_items": [{"id": item_id, "type": "plant", "x": item_xy, "y": item_xy}],
+        "walls": [],
+    })
+
+
+def test_snapshot_holds_the_saved_positions(room_id):
+    with Session(engine) as session:
+        first = save_layout(_layout(None, None, 0, 500), session, room_id, validate=False)
+        table_id, item_id = first["tables"][0].id, first["static_items"][0].id
+
+    with Session(engine) as session:
+        second = save_layout(_layout(table_id, item_id, 300, 900), session, room_id, validate=False)
+        snapshot = get_snapshot(session, room_id, second["version"]).layout
+
+    assert second["version"] == first["version"] + 1
+    assert [(table["x"], table["y"]) for table in snapshot["tables"]] == [(300, 0)]
+    assert [(item["x"], item["y"]) for item in snapshot["static_items"]] == [(900, 900)]
+
+
+def test_patch_bumps_the_version_without_a_snapshot(room_id):
+    with Session(engine) as session:
+        saved = save_layout(_layout(None, None, 0, 500), session, room_id, validate=False)
+        table_id = saved["tables"][0].id
+
+    with Session(engine) as session:
+        patched = patch_layout(
+            LayoutPatch.parse_obj({"operations": [{"op": "move", "kind": "table", "id": table_id, "x": 200}]}),
+            session, room_id
+        )
+        snapshots = get_snapshots(session, room_id)
+
+    assert patched["version"] == saved["version"] + 1
+    assert [snapshot["version"] for snapshot in snapshots] == [saved["version"]]
@@ -0,0 +1,83 @@
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import Date, DateTime, cast, func
+
+# Supported time-series bucket sizes (date_trunc fields)
+STATS_BUCKETS = ("day", "week", "month")
+
+# Length of the default range when `from` is omitted
+DEFAULT_STATS_DAYS = 30
+
+
+def parse_stats_dates(start: Optional[str], end: Optional[str]) -> Tuple[date, date]:
+    """
+    Validate the `from`/`to` query parameters of a stats report.
+    `to` defaults to today and `from` to DEFAULT_STATS_DAYS before `to`.
+    """
+    try:
+        end_date = datetime.strptime(end, "%Y-%m-%d").date() if end else date.today()
+        start_date = (
+            datetime.strptime(start, "%Y-%m-%d").date() if start
+            else end_date - timedelta(days=DEFAULT_STATS_DAYS - 1)
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Неверный формат даты. Используйте ГГГГ-ММ-ДД для даты."
+        )
+
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Начальная дата не может быть позже конечной"
+        )
+
+    return start_date, end_date
+
+
+def parse_stats_range(
+    start: Optional[str], end: Optional[str], bucket: str
+) -> Tuple[date, date, str]:
+    """Validate the `from`/`to`/`bucket` query parameters of a stats series"""
+    if bucket not in STATS_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Неверный интервал группировки. Используйте day, week или month."
+        )
+
+    start_date, end_date = parse_stats_dates(start, end)
+    return start_date, end_date, bucket
+
+
+def bucket_column(bucket: str, column):
+    """
+    SQL expression truncating a DATE column to the start of its bucket.
+    The column is cast to a plain timestamp first so that date_trunc does not
+    go through timestamptz and shift the bucket by the session time zone.
+    """
+    return cast(func.date_trunc(bucket, cast(column, DateTime)), Date)
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """Python counterpart of bucket_column (weeks start on Monday, like date_trunc)"""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def bucket_starts(start_date: date, end_date: date, bucket: str) -> List[date]:
+    """All bucket start dates covering the range, for zero-filling empty buckets"""
+    starts = []
+    current = bucket_start(start_date, bucket)
+    while current <= end_date:
+        starts.append(current)
+        if bucket == "day":
+            current += timedelta(days=1)
+        elif bucket == "week":
+            current += timedelta(days=7)
+        else:
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return starts
@@ -47,6 +47,12 @@ interface Room {
   updated_at: string;
 }
 
+// Конфликт геометрии, которым сервер отклоняет сохранение плана
+interface LayoutConflict {
+  type: 'overlap' | 'wall' | 'bounds';
+  items: { kind: 'table' | 'static_item' | 'wall'; index: number; id: string | null }[];
+}
+
 // Simple draggable component
 function Draggable({id, children}) {
   const {
@@ -95,6 +101,7 @@ const LayoutEditor: React.FC = () => {
   const [currentWallEndPoint, setCurrentWallEndPoint] = useState<{x: number, y: number} | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [conflicts, setConflicts] = useState<LayoutConflict[]>([]);
   const [updateCounter, setUpdateCounter] = useState(0);
   const editorRef = useRef<HTMLDivElement>(null);
   const [scale, setScale] = useState(1);
@@ -663,22 +670,24 @@ const LayoutEditor: React.FC = () => {
 
   // Обновляем saveLayout для использования activeRoom
   const saveLayout = async () => {
+    setConflicts([]);
     try {
       if (!activeRoom) {
         setError('Комната не инициализирована. Обновите страницу.');
         return;
       }
 
-      // Преобразуем таблицы для отправки на сервер
-      const transformedTables = tables.map(({ id, ...rest }) => ({
-        ...rest,
-        type: rest.type_name // Ensure type field is set properly for backend
+      // Преобразуем таблицы для отправки на сервер.
+      // ID сохраняем: сервер обновляет только изменившиеся элементы
+      const transformedTables = tables.map((table) => ({
+        ...table,
+        type: table.type_name // Ensure type field is set properly for backend
       }));
       
       const layoutData = {
         tables: transformedTables,
-        static_items: staticItems.map(({ id, ...rest }) => rest),
-        walls: walls.map(({ id, ...rest }) => rest),
+        static_items: staticItems,
+        walls: walls,
       };
 
       // Отладочный вывод
@@ -687,10 +696,38 @@ const LayoutEditor: React.FC = () => {
       await layoutAPI.saveLayout(layoutData, activeRoom.id);
       setError(null);
       alert('План зала сохранен успешно');
-    } catch (err) {
+    } catch (err: any) {
       console.error('Failed to save layout:', err);
-      setError('Не удалось сохранить план зала');
+      const detail = err.response?.data?.detail;
+      if (detail?.conflicts) {
+        setError('Не удалось сохранить план зала: элементы пересекаются или выходят за границы зала');
+        setConflicts(detail.conflicts);
+      } else {
+        setError('Не удалось сохранить план зала');
+      }
+    }
+  };
+
+  // Описание конфликта по индексам элементов в отправленном плане
+  const describeConflictItem = (item: LayoutConflict['items'][number]) => {
+    if (item.kind === 'table') {
+      return `стол №${tables[item.index]?.table_number ?? item.index + 1}`;
+    }
+    if (item.kind === 'static_item') {
+      return `элемент «${staticItems[item.index]?.type ?? item.index + 1}»`;
+    }
+    return `стена ${item.index + 1}`;
+  };
+
+  const describeConflict = (conflict: LayoutConflict) => {
+    const [first, second] = conflict.items.map(describeConflictItem);
+    if (conflict.type === 'bounds') {
+      return `${first} выходит за границы зала`;
+    }
+    if (conflict.type === 'wall') {
+      return `${first} пересекает стену (${second})`;
     }
+    return `${first} пересекается с ${second}`;
   };
 
   // Debug output of current positions
@@ -713,6 +750,13 @@ const LayoutEditor: React.FC = () => {
       {error && (
         <div className="bg-red-100 border border-red-400 text-red-700 px-4 py-3 rounded mb-4">
           {error}
+          {conflicts.length > 0 && (
+            <ul className="list-disc list-inside mt-2">
+              {conflicts.map((conflict, index) => (
+                <li key={index}>{describeConflict(conflict)}</li>
+              ))}
+            </ul>
+          )}
         </div>
       )}
 
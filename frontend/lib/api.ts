@@ -50,7 +50,24 @@ export const authAPI = {
 // Layout API
 export const layoutAPI = {
   getLayout: (roomId?: string) => api.get('/layout/', { params: { room_id: roomId } }),
+  // Columnar layout: parallel arrays per object kind, table types once by id
+  getCompactLayout: (roomId?: string) =>
+    api.get('/layout/enhanced', {
+      params: { room_id: roomId },
+      headers: { Accept: 'application/vnd.restaurant.layout.compact+json' }
+    }),
   saveLayout: (layoutData: any, roomId?: string) => api.post('/layout/save', layoutData, { params: { room_id: roomId } }),
+  validateLayout: (layoutData: any, roomId?: string) =>
+    api.post('/layout/validate', layoutData, { params: { room_id: roomId } }),
+  patchLayout: (operations: any[], roomId?: string) =>
+    api.patch('/layout/', { operations }, { params: { room_id: roomId } }),
+  getLayoutViewport: (x1: number, y1: number, x2: number, y2: number, roomId?: string) =>
+    api.get('/layout/viewport', { params: { x1, y1, x2, y2, room_id: roomId } }),
+  hitTestLayout: (x: number, y: number, roomId?: string) =>
+    api.get('/layout/hit-test', { params: { x, y, room_id: roomId } }),
+  getLayoutSnapshots: (roomId?: string) => api.get('/layout/snapshots', { params: { room_id: roomId } }),
+  restoreLayoutSnapshot: (version: number, roomId?: string) =>
+    api.post(`/layout/snapshots/${version}/restore`, null, { params: { room_id: roomId } }),
   getTableTypes: () => api.get('/layout/table-types'),
   addTable: (tableData: any, roomId?: string) => api.post('/layout/tables', tableData, { params: { room_id: roomId } }),
   addStaticItem: (itemData: any, roomId?: string) => api.post('/layout/static-items', itemData, { params: { room_id: roomId } }),
@@ -66,6 +83,7 @@ export const layoutAPI = {
   getRoom: (roomId: string) => api.get(`/layout/rooms/${roomId}`),
   createRoom: (roomData: any) => api.post('/layout/rooms', roomData),
   updateRoom: (roomId: string, roomData: any) => api.put(`/layout/rooms/${roomId}`, roomData),
+  setDefaultRoom: (roomId: string) => api.put(`/layout/rooms/${roomId}/default`),
   getOrCreateDefaultRoom: async () => {
     try {
       const { data: rooms } = await api.get('/layout/rooms');
@@ -82,13 +100,23 @@ export const layoutAPI = {
 
 // Reservations API
 export const reservationsAPI = {
-  getAvailability: (date: string, time?: string, duration: number = 1) => 
-    api.get('/reserve/availability', { params: { date, time, duration } }),
+  getAvailability: (date: string, time?: string, duration: number = 1, roomId?: string) => 
+    api.get('/reserve/availability', { params: { date, time, duration, room_id: roomId } }),
+  getAvailabilityRange: (startDate: string, endDate?: string, duration: number = 1, roomId?: string) =>
+    api.get('/reserve/availability/range', { params: { start_date: startDate, end_date: endDate, duration, room_id: roomId } }),
   createReservation: (reservationData: any) => api.post('/reserve', reservationData),
   getMyReservations: () => api.get('/reserve/my'),
   getAllReservations: (date: string) => api.get('/reserve', { params: { date } }),
   getReservationStats: (period?: string) => api.get('/reserve/stats', { params: { period } }),
+  getReservationStatsSeries: (from?: string, to?: string, bucket: string = 'day') =>
+    api.get('/reserve/stats/series', { params: { from, to, bucket } }),
+  getTableUtilization: (from?: string, to?: string) =>
+    api.get('/reserve/stats/utilization', { params: { from, to } }),
+  exportReservations: (from: string, to: string, format: string = 'csv') =>
+    api.get('/reserve/export', { params: { from, to, format }, responseType: 'blob' }),
   getOrderStats: () => api.get('/menu/stats'),
+  getOrderStatsSeries: (from?: string, to?: string, bucket: string = 'day') =>
+    api.get('/menu/stats/series', { params: { from, to, bucket } }),
   getReservationById: (id: string) => api.get(`/reserve/${id}`),
   deleteReservation: (id: string) => api.delete(`/reserve/${id}`),
   updateReservation: (id: string, reservationData: any) => api.put(`/reserve/${id}`, reservationData),